@@ -1,9 +1,71 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from .brain import TriageBrain # Importing the class we just made
-import os
+import asyncio
 import json
+import logging
+import os
+import sys
+import threading
+import time
+
+PROCESS_STARTED = time.perf_counter()
+
+# The core/engine modules use flat imports (see server/experiments)
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(SERVER_DIR, "app", "engine"))
+sys.path.insert(0, os.path.join(SERVER_DIR, "app", "core"))
+
+from brain import TriageBrain
+from rule_registry import RuleRegistry
+from llm_cache import LLMCache
+from session_manager import SessionManager
+from worker_pool import Overloaded, WorkerPool
+from bulk_triage import FORMATS, BulkTriage, spool_body
+from metrics import REGISTRY, current_trace, trace_request
+
+IMCI_RULES_PATH = os.path.join(SERVER_DIR, "data", "imci_rules.json")
+VECTOR_DB_DIR = os.path.join(SERVER_DIR, "storage", "vector_store", "imci_handbook_db")
+RULES_POLL_SECONDS = float(os.environ.get("IMCI_RULES_POLL_SECONDS", "2"))
+LLM_CACHE_PATH = os.environ.get(
+    "LLM_CACHE_PATH", os.path.join(SERVER_DIR, "storage", "llm_cache.sqlite3")
+)
+LLM_CACHE_TTL_SECONDS = float(os.environ.get("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+# Micro-batching of concurrent LLM calls; unset LLM_BATCH_WINDOW_MS disables it
+LLM_BATCH_WINDOW_MS = os.environ.get("LLM_BATCH_WINDOW_MS", "20")
+LLM_BATCH_SIZE = int(os.environ.get("LLM_BATCH_SIZE", "8"))
+LLM_MAX_IN_FLIGHT = int(os.environ.get("LLM_MAX_IN_FLIGHT", "2"))
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", "120"))
+
+# Admission control for LLM-backed requests: BRAIN_WORKERS run at once,
+# BRAIN_QUEUE wait, the rest are turned away with 429 + Retry-After
+BRAIN_WORKERS = int(os.environ.get("BRAIN_WORKERS", "4"))
+BRAIN_QUEUE = int(os.environ.get("BRAIN_QUEUE", "16"))
+BRAIN_THREADS = int(os.environ.get("BRAIN_THREADS", str(BRAIN_WORKERS)))
+
+# Multi-turn consultations held in memory (idle TTL + LRU cap)
+SESSION_TTL_SECONDS = float(os.environ.get("SESSION_TTL_SECONDS", "1800"))
+MAX_SESSIONS = int(os.environ.get("MAX_SESSIONS", "50000"))
+
+# /triage/bulk: rule evaluation on a process pool (all cores by default)
+BULK_WORKERS = int(os.environ.get("BULK_WORKERS", "0")) or None
+BULK_CHUNK_SIZE = int(os.environ.get("BULK_CHUNK_SIZE", "500"))
+
+# Warm-up is retried with exponential backoff (e.g. Ollama still starting);
+# once attempts run out, POST /warm_up starts another round
+WARMUP_ATTEMPTS = int(os.environ.get("WARMUP_ATTEMPTS", "5"))
+WARMUP_BACKOFF_SECONDS = float(os.environ.get("WARMUP_BACKOFF_SECONDS", "2"))
+WARMUP_BACKOFF_MAX_SECONDS = float(os.environ.get("WARMUP_BACKOFF_MAX_SECONDS", "60"))
+
+# Per-turn patient/rule dumps are DEBUG; set LOG_LEVEL=DEBUG to see them
+logging.basicConfig(
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+logger = logging.getLogger("medgemma.api")
 
 app = FastAPI()
 
@@ -15,38 +77,438 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def debug_timing(request: Request, call_next):
+    """
+    With `X-Debug-Timing: 1`, answer with a per-stage `Server-Timing`
+    breakdown (and `X-Token-Counts` when the model ran). Streaming
+    responses send their headers early; /analyze/stream adds a final
+    `timing` event instead.
+    """
+    if not request.headers.get("x-debug-timing"):
+        return await call_next(request)
+
+    with trace_request() as trace:
+        response = await call_next(request)
+
+    response.headers["Server-Timing"] = trace.server_timing()
+
+    if trace.tokens:
+        response.headers["X-Token-Counts"] = ", ".join(
+            f"{name}={count}" for name, count in trace.tokens.items()
+        )
+
+    return response
+
 # Global variable to store the AI
 brain = None
 
+# Live IMCI rules, hot-reloaded from IMCI_RULES_PATH
+rule_registry = None
+
+# Bounded pool the brain calls run on
+pool = WorkerPool(workers=BRAIN_WORKERS, max_queue=BRAIN_QUEUE, threads=BRAIN_THREADS)
+
+# Open /triage sessions
+sessions = SessionManager(ttl_seconds=SESSION_TTL_SECONDS, max_sessions=MAX_SESSIONS)
+
+# Batch rule evaluation; worker processes start on the first bulk request.
+# Bulk explanations share the interactive pool's admission control.
+bulk = BulkTriage(workers=BULK_WORKERS, chunk_size=BULK_CHUNK_SIZE, worker_pool=pool)
+
+# Held while a warm-up round (with its retries) runs
+warmup_lock = threading.Lock()
+
+# Import → startup-complete time; the model/vector store load afterwards
+startup_ms = None
+
 # Input Data Structure
 class PatientInput(BaseModel):
     symptoms: str
 
+class TriageMessage(BaseModel):
+    message: str
+
 @app.on_event("startup")
 async def startup():
-    global brain
-    # Point to the PDF in the 'data' folder
-    # Go up one level (..) then into 'data'
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    pdf_path = os.path.join(current_dir, "..", "data", "guidelines.pdf")
-    
+    global brain, rule_registry, startup_ms
+
     try:
-        brain = TriageBrain(pdf_path)
-        print("✅ SERVER ONLINE: AI is ready.")
+        rule_registry = RuleRegistry(IMCI_RULES_PATH, poll_interval=RULES_POLL_SECONDS)
+        rule_registry.start_watching()
+        logger.info("📜 IMCI rules loaded: version %s", rule_registry.version)
+
+        llm_cache = LLMCache(
+            LLM_CACHE_PATH,
+            ttl_seconds=LLM_CACHE_TTL_SECONDS,
+            max_entries=LLM_CACHE_MAX_ENTRIES
+        )
+
+        brain = build_brain(rule_registry, llm_cache)
+
+        # Rule-only triage is served right away; the model, embeddings and
+        # vector store load in the background (see /health)
+        _start_warm_up()
+
+        startup_ms = round(1000 * (time.perf_counter() - PROCESS_STARTED), 1)
+        logger.info("✅ SERVER ONLINE in %.1f ms: rules ready, AI warming up.", startup_ms)
     except Exception as e:
-        print(f"❌ ERROR: {e}")
-        print("💡 TIP: Did you put a PDF in server/data/guidelines.pdf?")
+        logger.error("❌ ERROR: %s", e)
+
+def build_brain(rule_registry, llm_cache=None, **components):
+    """
+    TriageBrain as the server configures it. `components` (llm, embeddings,
+    db) replace the real model/vector store, e.g. fakes for load tests.
+    """
+    return TriageBrain(
+        VECTOR_DB_DIR,
+        rule_registry,
+        llm_cache=llm_cache,
+        llm_batch_window=float(LLM_BATCH_WINDOW_MS) / 1000 if LLM_BATCH_WINDOW_MS else None,
+        llm_batch_size=LLM_BATCH_SIZE,
+        llm_max_in_flight=LLM_MAX_IN_FLIGHT,
+        llm_timeout=LLM_TIMEOUT_SECONDS,
+        executor=pool.executor,
+        **components
+    )
+
+def _warm_up(brain):
+    """Warm the brain up, retrying with backoff; one round at a time."""
+    if not warmup_lock.acquire(blocking=False):
+        return
+
+    try:
+        delay = WARMUP_BACKOFF_SECONDS
+
+        for attempt in range(1, WARMUP_ATTEMPTS + 1):
+            try:
+                brain.warm_up()
+                logger.info("✅ AI is ready.")
+                return
+            except Exception as e:
+                # brain.warm_up has logged the traceback
+                logger.error("❌ Warm-up attempt %d/%d failed: %s", attempt, WARMUP_ATTEMPTS, e)
+
+            if attempt < WARMUP_ATTEMPTS:
+                time.sleep(delay)
+                delay = min(2 * delay, WARMUP_BACKOFF_MAX_SECONDS)
+
+        logger.error(
+            "💡 TIP: Is Ollama running with %s pulled, and the vector store built under "
+            "server/storage/vector_store? POST /warm_up to retry.",
+            brain.model_name
+        )
+    finally:
+        warmup_lock.release()
+
+def _start_warm_up():
+    asyncio.get_running_loop().run_in_executor(None, _warm_up, brain)
+
+def _overloaded(e):
+    return JSONResponse(
+        {"error": "Server busy, retry later", "retry_after": e.retry_after},
+        status_code=429,
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def _timed(result, timings):
+    # Queue wait and service time reported separately
+    return JSONResponse(
+        result,
+        headers={
+            "X-Queue-Wait-Ms": str(timings["queue_wait_ms"]),
+            "X-Service-Time-Ms": str(timings["service_ms"])
+        }
+    )
+
+class AdmittedStream(StreamingResponse):
+    """
+    StreamingResponse holding a WorkerPool slot. The slot is released once
+    the response has been sent, or has failed to send, even if the body
+    iterator never started (client gone before the first chunk).
+    """
+
+    def __init__(self, content, ticket, **kwargs):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            pool.release(self.ticket)
+
+def _warming_up():
+    # A failed warm-up will not fix itself by waiting: no Retry-After
+    if brain.warmup_status == "failed":
+        return JSONResponse(
+            {
+                "error": "Brain warm-up failed",
+                "status": brain.warmup_status,
+                "warmup_error": brain.warmup_error,
+                "retrying": warmup_lock.locked()
+            },
+            status_code=503
+        )
+
+    # LLM-backed endpoints wait for warm-up instead of blocking the loop
+    return JSONResponse(
+        {"error": "Brain warming up", "status": brain.warmup_status},
+        status_code=503,
+        headers={"Retry-After": "5"}
+    )
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "rules_version": rule_registry.version if rule_registry else None,
+        "startup_ms": startup_ms,
+        "brain": brain.warmup_status if brain else "not loaded",
+        "load_timings": dict(brain.load_timings) if brain else {},
+        "warmup_error": brain.warmup_error if brain else None
+    }
+
+@app.post("/warm_up")
+async def warm_up():
+    """Start another warm-up round, e.g. after the model server came back."""
+    if not brain:
+        return {"error": "Brain not loaded"}
+
+    if not brain.ready and not warmup_lock.locked():
+        _start_warm_up()
+
+    return JSONResponse(
+        {"status": brain.warmup_status, "retrying": not brain.ready},
+        status_code=200 if brain.ready else 202
+    )
+
+@app.on_event("shutdown")
+async def shutdown():
+    if rule_registry is not None:
+        rule_registry.stop_watching()
+
+    if brain is not None and brain.scheduler is not None:
+        await brain.scheduler.close()
+
+    if brain is not None and brain.llm_cache is not None:
+        brain.llm_cache.close()
+
+    pool.shutdown()
+    bulk.close()
+
+@app.get("/rules")
+async def rules_info():
+    if not rule_registry:
+        return {"error": "Rules not loaded"}
+
+    return rule_registry.stats()
+
+@app.post("/triage/rules")
+async def rule_only_triage(data: PatientInput):
+    """Deterministic triage (no LLM); available during warm-up."""
+    if not brain:
+        return {"error": "Brain not loaded"}
+
+    return brain.rule_triage(data.symptoms)
+
+@app.post("/triage/bulk")
+async def bulk_triage(request: Request, format: str = "jsonl"):
+    """
+    JSONL or CSV (header row) of structured patient records in, NDJSON out:
+    one line per record, in input order, streamed as chunks finish. A
+    record with `"explain": true` also gets an LLM explanation (handbook
+    retrieval unless `"retrieve": false`) once the brain is ready.
+    """
+    if not rule_registry:
+        return {"error": "Rules not loaded"}
+
+    if format not in FORMATS:
+        return JSONResponse(
+            {"error": f"Unsupported format {format!r}, expected one of {list(FORMATS)}"},
+            status_code=400
+        )
+
+    # One rule version for the whole batch, even across a reload
+    rules = rule_registry.current
+    lines = await spool_body(request.stream())
+
+    async def results():
+        try:
+            async for result in bulk.arun(rules, lines, format, brain):
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            logger.exception("❌ Bulk triage failed")
+            yield json.dumps({"error": str(e)}) + "\n"
+        finally:
+            lines.close()
+
+    return StreamingResponse(
+        results(),
+        media_type="application/x-ndjson",
+        headers={"X-Rules-Version": rules.version}
+    )
+
+@app.get("/bulk")
+async def bulk_info():
+    return bulk.stats()
+
+@app.post("/triage")
+async def start_triage():
+    session = sessions.create()
+
+    return {"session_id": session.session_id, "status": session.status}
+
+@app.post("/triage/{session_id}/step")
+async def triage_step(session_id: str, data: TriageMessage):
+    if not brain:
+        return {"error": "Brain not loaded"}
+
+    if not brain.ready:
+        return _warming_up()
+
+    async with sessions.step(session_id) as session:
+        if session is None:
+            return JSONResponse({"error": "Unknown or expired session"}, status_code=404)
+
+        try:
+            result, timings = await pool.run(brain.atriage_step, session, data.message)
+        except Overloaded as e:
+            return _overloaded(e)
+
+    return _timed(
+        dict(
+            result,
+            session_id=session_id,
+            session_status=session.status,
+            patient_data=dict(session.patient_data)
+        ),
+        timings
+    )
+
+@app.get("/triage/{session_id}")
+async def triage_state(session_id: str):
+    session = sessions.get(session_id)
+
+    if session is None:
+        return JSONResponse({"error": "Unknown or expired session"}, status_code=404)
+
+    return {
+        "session_id": session_id,
+        "status": session.status,
+        "turns": session.turns,
+        "patient_data": dict(session.patient_data)
+    }
+
+@app.delete("/triage/{session_id}")
+async def end_triage(session_id: str):
+    return {"deleted": sessions.delete(session_id)}
+
+@app.get("/sessions")
+async def sessions_info():
+    return sessions.stats()
 
 @app.post("/analyze")
 async def analyze_patient(data: PatientInput):
     if not brain:
         return {"error": "Brain not loaded"}
-    
-    # Get raw string from AI
-    raw_response = brain.analyze(data.symptoms)
-    
-    # Parse it into real JSON
+
+    if not brain.ready:
+        return _warming_up()
+
+    # Extraction and guideline retrieval overlap; nothing blocks the loop
     try:
-        return json.loads(raw_response)
-    except:
-        return {"error": "Failed to parse JSON", "raw": raw_response}
\ No newline at end of file
+        result, timings = await pool.run(brain.aanalyze_text, data.symptoms)
+    except Overloaded as e:
+        return _overloaded(e)
+
+    return _timed(result, timings)
+
+@app.post("/analyze/stream")
+async def analyze_patient_stream(data: PatientInput):
+    """
+    Server-Sent Events: `rules` (risk level + classifications) as soon as
+    the rule engine has run, `token` events while the explanation is
+    generated, then `final` with the validated JSON (and `timing` with the
+    stage breakdown when X-Debug-Timing is set).
+    """
+    if not brain:
+        return {"error": "Brain not loaded"}
+
+    if not brain.ready:
+        return _warming_up()
+
+    # Admit before sending headers so a full pool can still answer 429
+    try:
+        ticket = await pool.acquire()
+    except Overloaded as e:
+        return _overloaded(e)
+
+    async def events():
+        failed = False
+
+        try:
+            async for event, payload in brain.astream_analyze_text(data.symptoms):
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+            trace = current_trace()
+
+            if trace is not None:
+                timing = {"stages": trace.breakdown(), "tokens": trace.tokens}
+                yield f"event: timing\ndata: {json.dumps(timing)}\n\n"
+        except Exception as e:
+            failed = True
+            logger.exception("❌ Streaming analysis failed")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        finally:
+            pool.release(ticket, failed=failed)
+
+    return AdmittedStream(
+        events(),
+        ticket,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-Queue-Wait-Ms": str(round(1000 * (ticket.started_at - ticket.enqueued_at), 1))
+        }
+    )
+
+@app.get("/llm_cache")
+async def llm_cache_info():
+    if not brain or brain.llm_cache is None:
+        return {"error": "LLM cache not configured"}
+
+    return brain.llm_cache.stats()
+
+@app.get("/llm_scheduler")
+async def llm_scheduler_info():
+    if not brain or brain.scheduler is None:
+        return {"error": "LLM batching not enabled"}
+
+    return brain.scheduler.stats()
+
+@app.get("/retrieval")
+async def retrieval_info():
+    if not brain:
+        return {"error": "Brain not loaded"}
+
+    if not brain.ready:
+        return _warming_up()
+
+    return {
+        "filters": brain.retriever.stats(),
+        "cache": brain.retrieval_cache.stats()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Stage latency and token histograms in the Prometheus text format."""
+    return PlainTextResponse(
+        REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+@app.get("/workers")
+async def workers_info():
+    return pool.stats()
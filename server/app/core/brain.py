@@ -1,70 +1,504 @@
-import json
-from langchain_chroma import Chroma
-from langchain_community.embeddings import FastEmbedEmbeddings
-from langchain_ollama import ChatOllama
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from functools import partial
+
+from rulengine import IMCIRuleEngine, IncrementalRuleEngine
+from question_planner import plan_questions
+from fast_extractor import fast_extract
+from result_cache import RuleResultCache
+from rule_registry import RuleRegistry
+from session import PATIENT_FIELDS
+from json_stream import (
+    JSONObjectScanner, parse_json_object, validate_explanation, validate_extraction
+)
+from llm_cache import template_hash
+from retrieval import EvidenceRetriever, RetrievalCache, vector_store_version
+from evidence import (
+    estimate_tokens, format_classifications, format_patient, pack_evidence, query_terms
+)
+from scheduler import LLMScheduler, ChatModelBackend
+from metrics import record_llm_call, record_stage, span
+
+logger = logging.getLogger(__name__)
+
+
+# Prompt templates. Their hashes are part of every LLM cache key, so editing
+# a template invalidates the responses cached for it.
+
+EXTRACTION_PROMPT = """
+Extract ONLY the clinical fields explicitly mentioned in the text.
 
-from rulengine import IMCIRuleEngine
+Rules:
+- Return ONLY fields that are directly mentioned.
+- If a field is not mentioned, DO NOT include it in JSON.
+- Do NOT assume values.
+- Do NOT return null fields.
+- Return minimal JSON.
 
+Allowed fields:
+- age_months
+- cough
+- fever
+- respiratory_rate
+- chest_indrawing
+- convulsions
 
-class TriageBrain:
+Text:
+{text}
+
+Return STRICT JSON with ONLY the mentioned fields and their values.
+"""
+
+EXPLANATION_PROMPT = """
+You are a pediatric clinical assistant.
+
+The risk level has ALREADY been determined by a deterministic clinical rule engine.
+
+RISK LEVEL: {risk_level}
+
+CLASSIFICATIONS:
+{classifications}
+
+PATIENT STRUCTURED DATA:
+{patient_data}
+
+IMCI GUIDELINES:
+{evidence}
+
+Explain the reasoning clearly.
+
+Return STRICT JSON:
+
+{{
+    "risk_level": "{risk_level}",
+    "explanation": "...",
+    "follow_up_questions": ["...", "...", "..."]
+}}
+"""
+
+PROMPT_TEMPLATES = {
+    "extraction": template_hash(EXTRACTION_PROMPT),
+    "explanation": template_hash(EXPLANATION_PROMPT)
+}
 
-    def __init__(self, persist_dir: str, rules: list):
+
+class TriageBrain:
+    """
+    Every entry point comes in a blocking form (scripts, experiments) and an
+    async form prefixed with `a` (the API). The async forms use the model's
+    `ainvoke` and run Chroma/embedding calls in a thread pool, so the event
+    loop never blocks on them.
+
+    The chat model, embeddings and vector store (and their langchain
+    imports) load on first use, or ahead of time via `warm_up()`; rules and
+    the deterministic pipeline are usable as soon as the constructor
+    returns. Pre-built components can be passed in as `llm`, `embeddings`
+    and `db`.
+    """
+
+    def __init__(
+        self,
+        persist_dir: str,
+        rules: list,
+        verify_incremental_rules: bool = False,
+        trace_rules: bool = False,
+        rule_cache_size: int = 4096,
+        max_questions: int = 3,
+        llm_cache=None,
+        llm_batch_window: float = None,
+        llm_batch_size: int = 8,
+        llm_max_in_flight: int = 2,
+        llm_timeout: float = None,
+        evidence_token_budget: int = 350,
+        retrieval_cache_size: int = 256,
+        llm=None,
+        embeddings=None,
+        db=None,
+        executor=None
+    ):
 
         self.model_name = "gemma:2b"
-        print(f"🧠 Initializing Brain with Model: {self.model_name}")
+        logger.info("🧠 Initializing Brain with Model: %s", self.model_name)
 
-        # Persistent structured DB
-        self.db = Chroma(
-            collection_name="imci_handbook",
-            persist_directory=persist_dir,
-            embedding_function=FastEmbedEmbeddings()
-        )
+        self.persist_dir = persist_dir
+        self.retrieval_cache_size = retrieval_cache_size
+
+        # Thread pool for blocking retrieval work in the async API
+        # (None: the event loop's default executor)
+        self.executor = executor
+
+        # Heavy components, created on first use (see warm_up)
+        self._components = {"llm": llm, "embeddings": embeddings, "db": db}
+        self._component_lock = threading.RLock()
+
+        # Per-stage load times (ms) and warm-up progress, for /health
+        self.load_timings = {}
+        self.warmup_status = "pending"
+        self.warmup_error = None
+
+        # Rules are compiled once and shared by every triage step; a
+        # RuleRegistry may also hot-swap them while the server runs
+        if isinstance(rules, RuleRegistry):
+            self.registry = rules
+        else:
+            self.registry = RuleRegistry.from_rules(rules)
+
+        # Cached evidence is per rules version: re-warm it after a reload
+        self.registry.add_listener(self._rules_reloaded)
+
+        # Debug: check every incremental rule update against a full evaluate()
+        self.verify_incremental_rules = verify_incremental_rules
+
+        # Debug: attach rule evaluation traces to responses
+        self.trace_rules = trace_rules
+
+        # Stateless evaluations: identical patient states share one result
+        self.rule_cache = RuleResultCache(maxsize=rule_cache_size)
+
+        # Follow-up questions asked per turn, most decisive first
+        self.max_questions = max_questions
+
+        # How many extractions were fully resolved without the LLM
+        self.extraction_stats = {"fast_path": 0, "llm": 0}
+
+        # Generations cut off once their JSON object closed
+        self.generation_stats = {"early_stops": 0}
+
+        # Optional LLMCache: temperature=0 makes responses a pure function
+        # of (model, prompt), so they can be reused across restarts
+        self.llm_cache = llm_cache
+
+        if self.llm_cache is not None:
+            self.llm_cache.retain(self.model_name, PROMPT_TEMPLATES.values())
+
+        # Retrieved evidence is packed into this many prompt tokens
+        self.evidence_token_budget = evidence_token_budget
+        self.prompt_stats = {"requests": 0, "tokens_saved": 0}
+
+        # Optional micro-batching of async model calls across concurrent
+        # sessions (llm_batch_window seconds; None sends each call directly)
+        self.scheduler = None
+        self.llm_timeout = llm_timeout
+
+        if llm_batch_window is not None:
+            self.scheduler = LLMScheduler(
+                ChatModelBackend(lambda: self.llm, complete=self.acomplete_llm),
+                max_batch_size=llm_batch_size,
+                batch_window=llm_batch_window,
+                max_in_flight=llm_max_in_flight
+            )
+
+    @property
+    def rules(self):
+        # Read once per request: a concurrent reload must not change the
+        # rule set halfway through a triage step
+        return self.registry.current
+
+    # --------------------------------------------------
+    # LAZY COMPONENTS + WARM-UP
+    # --------------------------------------------------
+
+    def _component(self, name, factory):
+        component = self._components.get(name)
+
+        if component is None:
+            with self._component_lock:
+                component = self._components.get(name)
+
+                if component is None:
+                    started = time.perf_counter()
+                    component = factory()
+                    self.load_timings[name] = round(1000 * (time.perf_counter() - started), 1)
+                    self._components[name] = component
+
+                    logger.info("⏱️ Loaded %s in %.1f ms", name, self.load_timings[name])
+
+        return component
+
+    def _load_llm(self):
+        from langchain_ollama import ChatOllama
 
         # LLM used ONLY for:
         # - Structured extraction
         # - Explanation
-        self.llm = ChatOllama(
+        return ChatOllama(
             model=self.model_name,
             temperature=0
         )
 
-        self.rules = rules
+    def _load_embeddings(self):
+        from langchain_community.embeddings import FastEmbedEmbeddings
+
+        return FastEmbedEmbeddings()
+
+    def _load_db(self):
+        from langchain_chroma import Chroma
+
+        # Persistent structured DB
+        return Chroma(
+            collection_name="imci_handbook",
+            persist_directory=self.persist_dir,
+            embedding_function=self.embeddings
+        )
+
+    def _load_retrieval_cache(self):
+        # Retrieval restricted by the rule result (chunk metadata filters);
+        # evidence for matched classifications is shared across requests
+        return RetrievalCache(
+            EvidenceRetriever(self.db, self.embeddings, k=5),
+            store_version=vector_store_version(self.persist_dir),
+            maxsize=self.retrieval_cache_size
+        )
+
+    @property
+    def llm(self):
+        return self._component("llm", self._load_llm)
+
+    @property
+    def embeddings(self):
+        return self._component("embeddings", self._load_embeddings)
+
+    @property
+    def db(self):
+        return self._component("db", self._load_db)
+
+    @property
+    def retrieval_cache(self):
+        return self._component("retrieval_cache", self._load_retrieval_cache)
+
+    @property
+    def retriever(self):
+        return self.retrieval_cache.retriever
+
+    @property
+    def ready(self):
+        return self.warmup_status == "ready"
+
+    def warm_up(self, prewarm_retrieval=True, probe_llm=True):
+        """
+        Load every heavy component in order, recording per-stage timings in
+        `load_timings`. Meant to run on a background thread while the
+        server already answers rule-only requests.
+        """
+
+        self.warmup_status = "warming"
+        started = time.perf_counter()
+
+        try:
+            self.llm
+
+            if probe_llm:
+                stage = time.perf_counter()
+                self.probe_llm()
+                self.load_timings["llm_probe"] = round(1000 * (time.perf_counter() - stage), 1)
+
+            self.embeddings
+            self.db
+            self.retrieval_cache
+
+            if prewarm_retrieval:
+                stage = time.perf_counter()
+                self.prewarm_retrieval()
+                self.load_timings["retrieval_prewarm"] = round(1000 * (time.perf_counter() - stage), 1)
+        except Exception as e:
+            self.warmup_status = "failed"
+            self.warmup_error = str(e)
+            logger.exception("❌ Warm-up failed")
+            raise
+
+        self.load_timings["total"] = round(1000 * (time.perf_counter() - started), 1)
+        self.warmup_status = "ready"
+        self.warmup_error = None
+
+        logger.info("✅ Warm-up complete in %.1f ms", self.load_timings["total"])
+
+    def probe_llm(self):
+        # Creating ChatOllama sends nothing to the server: generate a single
+        # chunk so a server that is down or a model that is not pulled fails
+        # warm-up, and the model load is paid here instead of by a request
+        for _ in self.llm.stream("Reply with OK."):
+            break
+
+    # --------------------------------------------------
+    # 0️⃣ CACHED MODEL CALLS
+    # --------------------------------------------------
+
+    def invoke_llm(self, template: str, prompt: str):
+
+        template_id = PROMPT_TEMPLATES[template]
+
+        if self.llm_cache is not None:
+            cached = self.llm_cache.get(self.model_name, template_id, prompt)
+            if cached is not None:
+                record_llm_call(template, prompt)
+                return cached
+
+        with span(f"llm_{template}"):
+            content = self.complete_llm(prompt)
+
+        record_llm_call(template, prompt, content)
+
+        if self.llm_cache is not None:
+            self.llm_cache.put(self.model_name, template_id, prompt, content)
+
+        return content
+
+    async def ainvoke_llm(self, template: str, prompt: str):
+
+        template_id = PROMPT_TEMPLATES[template]
+
+        # SQLite I/O (and its lock) stays off the event loop
+        if self.llm_cache is not None:
+            cached = await self._run_blocking(self.llm_cache.get, self.model_name, template_id, prompt)
+            if cached is not None:
+                record_llm_call(template, prompt)
+                return cached
+
+        # Includes time queued in the scheduler
+        with span(f"llm_{template}"):
+            if self.scheduler is not None:
+                content = await self.scheduler.submit(prompt, timeout=self.llm_timeout)
+            else:
+                content = await asyncio.wait_for(self.acomplete_llm(prompt), self.llm_timeout)
+
+        record_llm_call(template, prompt, content)
+
+        if self.llm_cache is not None:
+            await self._run_blocking(self.llm_cache.put, self.model_name, template_id, prompt, content)
+
+        return content
+
+    async def astream_llm(self, template: str, prompt: str):
+        """Yield response text chunks as the model generates them."""
+
+        template_id = PROMPT_TEMPLATES[template]
+
+        if self.llm_cache is not None:
+            cached = await self._run_blocking(self.llm_cache.get, self.model_name, template_id, prompt)
+            if cached is not None:
+                record_llm_call(template, prompt)
+                yield cached
+                return
+
+        chunks = []
+        scanner = JSONObjectScanner()
+
+        # Generation time only, not the time the consumer spends per chunk
+        generating = 0.0
+        started = time.perf_counter()
+
+        async for chunk in self.llm.astream(prompt):
+            generating += time.perf_counter() - started
+            chunks.append(chunk.content)
+            yield chunk.content
+            started = time.perf_counter()
+
+            if scanner.feed(chunk.content):
+                self.generation_stats["early_stops"] += 1
+                break
+
+        record_stage(f"llm_{template}", generating)
+        record_llm_call(template, prompt, "".join(chunks))
+
+        # Only complete generations are cached (not abandoned streams)
+        if self.llm_cache is not None:
+            await self._run_blocking(
+                self.llm_cache.put, self.model_name, template_id, prompt,
+                scanner.text if scanner.done else "".join(chunks)
+            )
+
+    def complete_llm(self, prompt: str):
+        """
+        Model output for `prompt`, streamed and cut off as soon as the JSON
+        object the prompt asks for is closed (no trailing chatter).
+        """
+
+        chunks = []
+        scanner = JSONObjectScanner()
+
+        for chunk in self.llm.stream(prompt):
+            chunks.append(chunk.content)
+
+            if scanner.feed(chunk.content):
+                self.generation_stats["early_stops"] += 1
+                return scanner.text
+
+        return "".join(chunks)
+
+    async def acomplete_llm(self, prompt: str):
+
+        chunks = []
+        scanner = JSONObjectScanner()
+
+        async for chunk in self.llm.astream(prompt):
+            chunks.append(chunk.content)
+
+            if scanner.feed(chunk.content):
+                # Leaving the loop closes the stream, which stops generation
+                self.generation_stats["early_stops"] += 1
+                return scanner.text
+
+        return "".join(chunks)
 
     # --------------------------------------------------
     # 1️⃣ STRUCTURED EXTRACTION FROM USER TEXT
     # --------------------------------------------------
 
     def extract_structured_data(self, text: str):
-        prompt = f"""
-Extract ONLY the clinical fields explicitly mentioned in the text.
 
-Rules:
-- Return ONLY fields that are directly mentioned.
-- If a field is not mentioned, DO NOT include it in JSON.
-- Do NOT assume values.
-- Do NOT return null fields.
-- Return minimal JSON.
+        with span("extraction"):
+            # Deterministic parse first: exact, and microseconds instead of
+            # an LLM round-trip
+            parsed, complete = fast_extract(text)
 
-Allowed fields:
-- age_months
-- cough
-- fever
-- respiratory_rate
-- chest_indrawing
-- convulsions
+            if complete:
+                self.extraction_stats["fast_path"] += 1
+                return parsed
 
-Text:
-{text}
+            self.extraction_stats["llm"] += 1
+            return self._merge_extraction(parsed, self.llm_extract(text))
 
-Return STRICT JSON with ONLY the mentioned fields and their values.
-"""
+    async def aextract_structured_data(self, text: str):
 
-        response = self.llm.invoke(prompt)
+        with span("extraction"):
+            parsed, complete = fast_extract(text)
 
-        try:
-            return json.loads(response.content)
-        except Exception:
-            return {}
+            if complete:
+                self.extraction_stats["fast_path"] += 1
+                return parsed
+
+            self.extraction_stats["llm"] += 1
+            return self._merge_extraction(parsed, await self.allm_extract(text))
+
+    def _merge_extraction(self, parsed, extracted):
+
+        # The LLM only runs when the pattern matcher could not account for
+        # the whole text, so where the two disagree the LLM's reading of the
+        # full text wins; the patterns fill in fields it left out
+        merged = dict(parsed)
+        merged.update(extracted)
+
+        return merged
+
+    def llm_extract(self, text: str):
+        content = self.invoke_llm("extraction", self._extraction_prompt(text))
+        return self._parse_extraction(content)
+
+    async def allm_extract(self, text: str):
+        content = await self.ainvoke_llm("extraction", self._extraction_prompt(text))
+        return self._parse_extraction(content)
+
+    def _extraction_prompt(self, text):
+        return EXTRACTION_PROMPT.format(text=text)
+
+    def _parse_extraction(self, content):
+        # Repaired if malformed, then checked against the session fields
+        extracted = parse_json_object(content)
+
+        return validate_extraction(extracted) if extracted is not None else {}
 
     # --------------------------------------------------
     # 2️⃣ MAIN INTERACTIVE TRIAGE STEP
@@ -75,98 +509,337 @@ Return STRICT JSON with ONLY the mentioned fields and their values.
         # Extract structured info from text
         extracted = self.extract_structured_data(user_input)
 
+        rule_result, reply = self._advance_session(session, extracted)
+
+        if reply is not None:
+            return reply
+
+        return self.generate_final_response(
+            rule_result,
+            session.patient_data,
+            user_input
+        )
+
+    async def atriage_step(self, session, user_input: str):
+
+        extracted = await self.aextract_structured_data(user_input)
+
+        rule_result, reply = self._advance_session(session, extracted)
+
+        if reply is not None:
+            return reply
+
+        return await self.agenerate_final_response(
+            rule_result,
+            session.patient_data,
+            user_input
+        )
+
+    def _advance_session(self, session, extracted):
+        """
+        Apply one turn of extracted fields to `session`. Returns
+        (rule_result, reply); reply is None once the case is ready for the
+        final explanation.
+        """
+
         # Update session patient data
-        session.update_patient_data(extracted)
+        changed = session.update_patient_data(extracted)
 
-        print("🔎 Current Patient Data:", session.patient_data)
+        logger.debug("🔎 Current Patient Data: %s", session.patient_data)
 
-        # Run deterministic rule engine
-        rule_engine = IMCIRuleEngine(self.rules, session.patient_data)
-        rule_result = rule_engine.evaluate()
+        # Run deterministic rule engine, re-scoring only rules that read
+        # the fields this turn changed (full rebuild after a rules reload)
+        rules = self.rules
 
-        print("🔎 Rule Engine Result:", rule_result)
+        with span("rules"):
+            if session.rule_state is None or session.rule_state.compiled is not rules:
+                session.rule_state = IncrementalRuleEngine(
+                    rules,
+                    session.patient_data,
+                    verify=self.verify_incremental_rules,
+                    trace=self.trace_rules
+                )
 
-        # If classification exists → final decision
-        if rule_result["classifications"]:
-            session.status = "complete"
+            rule_result = session.rule_state.update(changed)
 
-            return self.generate_final_response(
-                rule_result,
-                session.patient_data,
-                user_input
-            )
+        logger.debug("🔎 Rule Engine Result: %s", rule_result)
+
+        # Only ask for fields that can still change the outcome
+        plan = plan_questions(rules, session.patient_data, session.get_missing_fields())
+
+        # Classification exists and no answer can change the risk level
+        # (e.g. a danger sign fired) → final decision
+        if rule_result["classifications"] and plan.settled:
+            session.status = "complete"
+            return rule_result, None
 
-        # If no match → ask for missing info
-        missing = session.get_missing_fields()
+        # Otherwise ask only for missing info that can still change the
+        # risk level, most decisive first
+        questions = plan.risk_fields
 
-        if missing:
+        if questions:
             session.status = "incomplete"
 
-            return {
+            return rule_result, {
                 "status": "incomplete",
                 "message": "More information required.",
                 "questions": [
                     f"Please provide information about: {field}"
-                    for field in missing
-                ]
+                    for field in questions[:self.max_questions]
+                ],
+                "rules_version": rule_result["rules_version"]
             }
 
-        return {
+        return rule_result, {
             "status": "undetermined",
-            "message": "Unable to classify based on available data."
+            "message": "Unable to classify based on available data.",
+            "rules_version": rule_result["rules_version"]
         }
 
     # --------------------------------------------------
     # 3️⃣ FINAL RESPONSE WITH RETRIEVAL + EXPLANATION
     # --------------------------------------------------
 
-    def generate_final_response(self, rule_result, patient_data, raw_text):
+    def retrieve_evidence(self, raw_text: str, rule_result, patient_data):
 
-        risk_level = rule_result["overall_risk_level"]
+        with span("retrieval"):
+            if self.retrieval_cache.key(rule_result, patient_data) is not None:
+                return self.retrieval_cache.retrieve(rule_result, patient_data)
 
-        # Simple similarity retrieval
-        docs = self.db.similarity_search(raw_text, k=5)
-        evidence = "\n\n".join([doc.page_content for doc in docs])
+            return self.retriever.retrieve(raw_text, rule_result, patient_data)
 
-        prompt = f"""
-You are a pediatric clinical assistant.
+    def prewarm_retrieval(self):
+        return self.retrieval_cache.prewarm(self.rules)
 
-The risk level has ALREADY been determined by a deterministic clinical rule engine.
+    def _rules_reloaded(self, rules):
+        # Runs on the registry's watcher thread; before warm-up there is
+        # nothing cached yet and warm_up prewarms the current rules itself
+        if self.ready:
+            self.retrieval_cache.prewarm(rules)
 
-RISK LEVEL: {risk_level}
+    def _run_blocking(self, fn, *args):
+        # Embedding, Chroma search and cache I/O are blocking: keep them off
+        # the loop. The context is copied so their spans land in the
+        # request's trace.
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self.executor, partial(context.run, fn, *args))
 
-CLASSIFICATIONS:
-{rule_result["classifications"]}
+    async def aembed_query(self, raw_text: str):
+        return await self._run_blocking(self.retriever.embed, raw_text)
 
-PATIENT STRUCTURED DATA:
-{patient_data}
+    async def aretrieve_evidence(self, raw_text: str, rule_result, patient_data, query_vector=None):
 
-IMCI GUIDELINES:
-{evidence}
+        with span("retrieval"):
+            if self.retrieval_cache.key(rule_result, patient_data) is not None:
+                docs = self.retrieval_cache.get(rule_result, patient_data)
 
-Explain the reasoning clearly.
+                if docs is None:
+                    docs = await self._run_blocking(
+                        self.retrieval_cache.retrieve, rule_result, patient_data
+                    )
 
-Return STRICT JSON:
+                return docs
 
-{{
-    "risk_level": "{risk_level}",
-    "explanation": "...",
-    "follow_up_questions": ["...", "...", "..."]
-}}
-"""
+            if query_vector is None:
+                query_vector = await self.aembed_query(raw_text)
 
-        response = self.llm.invoke(prompt)
+            return await self._run_blocking(
+                self.retriever.search, query_vector, rule_result, patient_data
+            )
 
-        try:
-            parsed = json.loads(response.content)
-        except Exception:
+    async def _raw_query_vector(self, embedding, rule_result, patient_data):
+        # The speculative raw-text embedding is only needed when the
+        # classification-keyed cache does not apply
+        if self.retrieval_cache.key(rule_result, patient_data) is not None:
+            embedding.cancel()
+            return None
+
+        return await embedding
+
+    def generate_final_response(self, rule_result, patient_data, raw_text, docs=None):
+
+        if docs is None:
+            docs = self.retrieve_evidence(raw_text, rule_result, patient_data)
+
+        with span("explanation"):
+            prompt, prompt_stats = self._explanation_prompt(rule_result, patient_data, raw_text, docs)
+            content = self.invoke_llm("explanation", prompt)
+
+            return self._finalize_explanation(content, rule_result, prompt_stats)
+
+    async def agenerate_final_response(self, rule_result, patient_data, raw_text, docs=None):
+
+        if docs is None:
+            docs = await self.aretrieve_evidence(raw_text, rule_result, patient_data)
+
+        with span("explanation"):
+            prompt, prompt_stats = self._explanation_prompt(rule_result, patient_data, raw_text, docs)
+            content = await self.ainvoke_llm("explanation", prompt)
+
+            return self._finalize_explanation(content, rule_result, prompt_stats)
+
+    def _explanation_prompt(self, rule_result, patient_data, raw_text, docs):
+        """
+        (prompt, prompt_stats). Evidence is packed into the token budget and
+        the rule result is rendered compactly; prompt_stats compares the
+        size against pasting every chunk and the raw reprs.
+        """
+
+        evidence, packing = pack_evidence(
+            docs,
+            query_terms(rule_result, patient_data, raw_text),
+            self.evidence_token_budget
+        )
+
+        prompt = EXPLANATION_PROMPT.format(
+            risk_level=rule_result["overall_risk_level"],
+            classifications=format_classifications(rule_result["classifications"]),
+            patient_data=format_patient(patient_data),
+            evidence=evidence
+        )
+
+        unpacked = EXPLANATION_PROMPT.format(
+            risk_level=rule_result["overall_risk_level"],
+            classifications=rule_result["classifications"],
+            patient_data=patient_data,
+            evidence="\n\n".join([doc.page_content for doc in docs])
+        )
+
+        prompt_tokens = estimate_tokens(prompt)
+        saved = estimate_tokens(unpacked) - prompt_tokens
+
+        self.prompt_stats["requests"] += 1
+        self.prompt_stats["tokens_saved"] += saved
+
+        logger.debug("✂️ Explanation prompt: %d tokens (%d saved)", prompt_tokens, saved)
+
+        return prompt, dict(packing, prompt_tokens=prompt_tokens, tokens_saved=saved)
+
+    def _finalize_explanation(self, content, rule_result, prompt_stats=None):
+
+        risk_level = rule_result["overall_risk_level"]
+
+        parsed = parse_json_object(content)
+
+        if parsed is not None:
+            parsed = validate_explanation(parsed)
+        else:
             parsed = {
                 "risk_level": risk_level,
-                "explanation": response.content.strip(),
+                "explanation": content.strip(),
                 "follow_up_questions": []
             }
 
         # Safety enforcement
         parsed["risk_level"] = risk_level
+        parsed["rules_version"] = rule_result["rules_version"]
+
+        if "trace" in rule_result:
+            parsed["rule_trace"] = rule_result["trace"]
+
+        if prompt_stats is not None:
+            parsed["prompt_stats"] = prompt_stats
 
         return parsed
+
+    # --------------------------------------------------
+    # 4️⃣ ONE-SHOT ANALYSIS
+    # --------------------------------------------------
+
+    def evaluate_rules(self, patient_data: dict):
+
+        with span("rules"):
+            if self.trace_rules:
+                return IMCIRuleEngine(self.rules, patient_data, trace=True).evaluate()
+
+            return self.rule_cache.evaluate(self.rules, patient_data)
+
+    def rule_triage(self, raw_text: str):
+        """
+        Deterministic triage: pattern extraction, rule evaluation and the
+        missing fields that can still change the risk level. Needs neither
+        the LLM nor the vector store, so it works before warm-up finishes.
+        """
+
+        patient_data, complete = fast_extract(raw_text)
+        rule_result = self.evaluate_rules(patient_data)
+
+        missing = [field for field in PATIENT_FIELDS if patient_data.get(field) is None]
+        plan = plan_questions(self.rules, patient_data, missing)
+
+        return dict(
+            rule_result,
+            patient_data=patient_data,
+            extraction_complete=complete,
+            missing_fields=plan.risk_fields
+        )
+
+    def analyze(self, patient_data: dict, raw_text: str):
+
+        return self.generate_final_response(
+            self.evaluate_rules(patient_data),
+            patient_data,
+            raw_text
+        )
+
+    async def aanalyze(self, patient_data: dict, raw_text: str):
+
+        return await self.agenerate_final_response(
+            self.evaluate_rules(patient_data),
+            patient_data,
+            raw_text
+        )
+
+    async def aanalyze_text(self, raw_text: str):
+        """
+        Free text → explained triage. Embedding the query only needs the
+        raw text, so it runs concurrently with extraction; the filtered
+        search then runs once the rule result is known.
+        """
+
+        embedding = asyncio.ensure_future(self.aembed_query(raw_text))
+
+        try:
+            patient_data = await self.aextract_structured_data(raw_text)
+            rule_result = self.evaluate_rules(patient_data)
+            query_vector = await self._raw_query_vector(embedding, rule_result, patient_data)
+        except BaseException:
+            embedding.cancel()
+            raise
+
+        docs = await self.aretrieve_evidence(raw_text, rule_result, patient_data, query_vector)
+
+        return await self.agenerate_final_response(rule_result, patient_data, raw_text, docs)
+
+    async def astream_analyze_text(self, raw_text: str):
+        """
+        aanalyze_text as an async generator of (event, data) pairs:
+        "rules" as soon as the rule engine has run, one "token" per
+        explanation chunk, then "final" with the validated response.
+        """
+
+        embedding = asyncio.ensure_future(self.aembed_query(raw_text))
+
+        try:
+            patient_data = await self.aextract_structured_data(raw_text)
+            rule_result = self.evaluate_rules(patient_data)
+
+            # Deterministic part first: it does not depend on the LLM
+            yield "rules", dict(rule_result, patient_data=patient_data)
+
+            query_vector = await self._raw_query_vector(embedding, rule_result, patient_data)
+        except BaseException:
+            embedding.cancel()
+            raise
+
+        docs = await self.aretrieve_evidence(raw_text, rule_result, patient_data, query_vector)
+
+        prompt, prompt_stats = self._explanation_prompt(rule_result, patient_data, raw_text, docs)
+        chunks = []
+
+        async for chunk in self.astream_llm("explanation", prompt):
+            chunks.append(chunk)
+            yield "token", {"text": chunk}
+
+        yield "final", self._finalize_explanation("".join(chunks), rule_result, prompt_stats)
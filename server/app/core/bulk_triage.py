@@ -0,0 +1,443 @@
+import argparse
+import asyncio
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+CORE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(CORE_DIR, "..", "engine"))
+
+from rulengine import IMCIRuleEngine
+from rule_compiler import compile_rules
+from evidence import format_patient
+from worker_pool import Overloaded
+
+
+FORMATS = ("jsonl", "csv")
+
+# Record keys that are request options, not patient fields
+OPTION_KEYS = ("id", "explain", "retrieve", "symptoms")
+
+
+# ==============================
+# INPUT PARSING
+# ==============================
+
+def coerce_csv_value(value):
+    """CSV cells are strings: map them back to None / bool / number."""
+
+    value = value.strip()
+    lowered = value.lower()
+
+    if lowered in ("", "null", "none", "na", "n/a"):
+        return None
+    if lowered in ("true", "yes", "y"):
+        return True
+    if lowered in ("false", "no", "n"):
+        return False
+
+    try:
+        return int(value)
+    except ValueError:
+        pass
+
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+class RecordParser:
+    """
+    Turns lines of JSONL, or of CSV with a header row, into record dicts.
+    Lines can be fed in pieces; one record per line (no embedded newlines
+    in CSV cells).
+    """
+
+    def __init__(self, fmt):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format {fmt!r}, expected one of {FORMATS}")
+
+        self.fmt = fmt
+        self.header = None
+
+    def parse(self, lines):
+        records = []
+
+        for line in lines:
+            if not line.strip():
+                continue
+
+            if self.fmt == "jsonl":
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    record = {"_error": f"Invalid JSON: {e}"}
+
+                if not isinstance(record, dict):
+                    record = {"_error": "Record is not a JSON object"}
+
+                records.append(record)
+                continue
+
+            row = next(csv.reader([line]))
+
+            if self.header is None:
+                self.header = [name.strip() for name in row]
+                continue
+
+            records.append({
+                name: coerce_csv_value(cell)
+                for name, cell in zip(self.header, row)
+            })
+
+        return records
+
+
+def chunk_lines(lines, size):
+    chunk = []
+
+    for line in lines:
+        chunk.append(line)
+
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+async def spool_body(byte_chunks, max_memory=8 * 1024 * 1024):
+    """
+    Read a request body into a temporary file (in memory up to
+    `max_memory`, on disk beyond) and return it as text lines.
+
+    The body has to be fully received before the response starts
+    streaming: under ASGI < 2.4 Starlette's StreamingResponse reads the
+    same receive channel to watch for disconnects and would swallow the
+    rest of the upload.
+    """
+
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+
+    async for data in byte_chunks:
+        spool.write(data)
+
+    spool.seek(0)
+    return io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+
+
+# ==============================
+# RULE EVALUATION (WORKER PROCESSES)
+# ==============================
+
+# Compiled rule sets per worker process, by rules version
+_WORKER_RULES = {}
+
+
+def evaluate_chunk(rules_source, rules_version, records):
+    """
+    Rule results for `records`, in order. Runs in a worker process; rules
+    are compiled once per process and version.
+    """
+
+    compiled = _WORKER_RULES.get(rules_version)
+
+    if compiled is None:
+        _WORKER_RULES.clear()
+        compiled = _WORKER_RULES[rules_version] = compile_rules(rules_source, reorder=True)
+
+    valid = [r for r in records if "_error" not in r]
+    results = iter(IMCIRuleEngine(compiled).evaluate_many(valid))
+
+    return [
+        {"error": r["_error"]} if "_error" in r else next(results)
+        for r in records
+    ]
+
+
+def _patient_fields(record):
+    return {k: v for k, v in record.items() if k not in OPTION_KEYS and not k.startswith("_")}
+
+
+def _option(record, key, default=False):
+    value = record.get(key)
+
+    if value is None:
+        return default
+
+    return value is True or str(value).lower() in ("true", "yes", "1")
+
+
+# ==============================
+# BULK RUNNER
+# ==============================
+
+class BulkTriage:
+    """
+    Rule-engine triage for large patient batches.
+
+    Records are evaluated in chunks of `chunk_size` on a process pool (all
+    cores by default) with the vectorized `evaluate_many`; at most
+    `max_pending` chunks are in flight, so memory stays bounded however
+    long the input is, and results come back in input order. Records with
+    `"explain": true` also get an LLM explanation from `brain`, grounded in
+    retrieved handbook evidence unless `"retrieve": false`.
+
+    In the API, explanations go through the interactive `worker_pool`'s
+    admission control, at most `explain_concurrency` at a time (half its
+    workers by default), so a large upload cannot starve /analyze; a
+    record turned away gets an error with `retry_after`.
+    """
+
+    def __init__(self, workers=None, chunk_size=500, max_pending=None,
+                 worker_pool=None, explain_concurrency=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.max_pending = max_pending or 2 * self.workers
+
+        # Spawned, not forked: the server process runs threads (watchers,
+        # executors) whose locks a fork would copy in a held state
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+        self.worker_pool = worker_pool
+        self.explain_concurrency = explain_concurrency or (
+            max(1, worker_pool.workers // 2) if worker_pool is not None else 4
+        )
+        self._explain_slots = None
+
+        self.records = 0
+        self.explained = 0
+        self.explain_rejected = 0
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _result(self, index, record, rule_result):
+        result = {"index": index}
+
+        if "id" in record:
+            result["id"] = record["id"]
+
+        result.update(rule_result)
+        return result
+
+    def _explain_args(self, record, rule_result):
+        patient_data = _patient_fields(record)
+        raw_text = record.get("symptoms") or format_patient(patient_data)
+        docs = None if _option(record, "retrieve", default=True) else []
+        return rule_result, patient_data, raw_text, docs
+
+    # ----------------------------------------
+    # Blocking (CLI)
+    # ----------------------------------------
+
+    def run(self, rules, lines, fmt, brain=None):
+        """Yield one result dict per record, in input order."""
+
+        parser = RecordParser(fmt)
+        pending = deque()
+        index = 0
+
+        def drain(chunk_start, records, future):
+            for offset, (record, rule_result) in enumerate(zip(records, future.result())):
+                result = self._result(chunk_start + offset, record, rule_result)
+
+                if "error" not in rule_result and _option(record, "explain"):
+                    result["explanation"] = self._explain(brain, record, rule_result)
+
+                yield result
+
+        for lines_chunk in chunk_lines(lines, self.chunk_size):
+            records = parser.parse(lines_chunk)
+
+            if not records:
+                continue
+
+            future = self.pool.submit(evaluate_chunk, rules.source, rules.version, records)
+            pending.append((index, records, future))
+            index += len(records)
+            self.records += len(records)
+
+            if len(pending) >= self.max_pending:
+                yield from drain(*pending.popleft())
+
+        while pending:
+            yield from drain(*pending.popleft())
+
+    def _explain(self, brain, record, rule_result):
+        if brain is None:
+            return {"error": "Explanations are not available"}
+
+        self.explained += 1
+
+        try:
+            return brain.generate_final_response(*self._explain_args(record, rule_result))
+        except Exception as e:
+            return {"error": str(e)}
+
+    # ----------------------------------------
+    # Async (API)
+    # ----------------------------------------
+
+    async def arun(self, rules, lines, fmt, brain=None):
+        """
+        Async version of `run`: rule chunks are awaited instead of blocking
+        the loop, and a chunk's explanations run concurrently up to
+        `explain_concurrency`.
+        """
+
+        loop = asyncio.get_running_loop()
+        parser = RecordParser(fmt)
+        pending = deque()
+        index = 0
+
+        async def drain(chunk_start, records, future):
+            rule_results = await future
+            results = [
+                self._result(chunk_start + offset, record, rule_result)
+                for offset, (record, rule_result) in enumerate(zip(records, rule_results))
+            ]
+
+            wanted = [
+                (result, record) for result, record in zip(results, records)
+                if "error" not in result and _option(record, "explain")
+            ]
+            explanations = await asyncio.gather(
+                *(self._aexplain(brain, record, result) for result, record in wanted)
+            )
+
+            for (result, _), explanation in zip(wanted, explanations):
+                result["explanation"] = explanation
+
+            return results
+
+        try:
+            for lines_chunk in chunk_lines(lines, self.chunk_size):
+                records = parser.parse(lines_chunk)
+
+                if not records:
+                    continue
+
+                future = loop.run_in_executor(
+                    self.pool, evaluate_chunk, rules.source, rules.version, records
+                )
+                pending.append((index, records, future))
+                index += len(records)
+                self.records += len(records)
+
+                if len(pending) >= self.max_pending:
+                    for result in await drain(*pending.popleft()):
+                        yield result
+
+            while pending:
+                for result in await drain(*pending.popleft()):
+                    yield result
+        finally:
+            for _, _, future in pending:
+                future.cancel()
+
+    async def _aexplain(self, brain, record, result):
+        if brain is None or not brain.ready:
+            return {"error": "Explanations are not available"}
+
+        if self._explain_slots is None:
+            self._explain_slots = asyncio.Semaphore(self.explain_concurrency)
+
+        rule_result = {k: v for k, v in result.items() if k not in ("index", "id")}
+        args = self._explain_args(record, rule_result)
+
+        async with self._explain_slots:
+            try:
+                if self.worker_pool is not None:
+                    explanation, _ = await self.worker_pool.run(brain.agenerate_final_response, *args)
+                else:
+                    explanation = await brain.agenerate_final_response(*args)
+            except Overloaded as e:
+                self.explain_rejected += 1
+                return {"error": "Server busy, explanation skipped", "retry_after": e.retry_after}
+            except Exception as e:
+                return {"error": str(e)}
+
+        self.explained += 1
+        return explanation
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "chunk_size": self.chunk_size,
+            "max_pending": self.max_pending,
+            "records": self.records,
+            "explained": self.explained,
+            "explain_concurrency": self.explain_concurrency,
+            "explain_rejected": self.explain_rejected
+        }
+
+
+# ==============================
+# CLI
+# ==============================
+
+def main():
+    server_dir = os.path.join(CORE_DIR, "..", "..")
+
+    parser = argparse.ArgumentParser(
+        description="Rule-engine triage for JSONL/CSV patient batches (NDJSON out)."
+    )
+    parser.add_argument("input", help="Input file, or - for stdin")
+    parser.add_argument("--format", choices=FORMATS, help="Default: from the file extension")
+    parser.add_argument("--output", default="-", help="NDJSON output file (default stdout)")
+    parser.add_argument("--rules", default=os.path.join(server_dir, "data", "imci_rules.json"))
+    parser.add_argument("--workers", type=int, default=None, help="Default: all cores")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument(
+        "--explain", action="store_true",
+        help="Load the LLM + vector store for records with \"explain\": true"
+    )
+    parser.add_argument(
+        "--vector-db", default=os.path.join(server_dir, "storage", "vector_store", "imci_handbook_db")
+    )
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+
+    from rule_registry import RuleRegistry
+
+    registry = RuleRegistry(args.rules)
+    brain = None
+
+    if args.explain:
+        from brain import TriageBrain
+        brain = TriageBrain(args.vector_db, registry)
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", newline="")
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+
+    bulk = BulkTriage(workers=args.workers, chunk_size=args.chunk_size)
+
+    try:
+        for result in bulk.run(registry.current, source, fmt, brain):
+            output.write(json.dumps(result) + "\n")
+    finally:
+        bulk.close()
+
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"✅ {bulk.records} records triaged ({bulk.explained} explained)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import math
+import re
+
+
+# ==============================
+# TOKEN ESTIMATE
+# ==============================
+
+def estimate_tokens(text):
+    # ~4 characters per token for English prose with Gemma's tokenizer;
+    # only used for budgeting, so an estimate is enough
+    return math.ceil(len(text) / 4)
+
+
+# ==============================
+# COMPACT PROMPT FIELDS
+# ==============================
+
+def format_classifications(classifications):
+    """One line per matched rule instead of a list-of-dicts repr."""
+
+    if not classifications:
+        return "none"
+
+    return "\n".join(
+        f"- {c['condition']} (module {c['module']}, severity {c['severity']}, "
+        f"confidence {c['confidence']})"
+        for c in classifications
+    )
+
+
+def format_patient(patient_data):
+    """`field=value` pairs for the fields that are known."""
+
+    known = [
+        f"{field}={'yes' if value is True else 'no' if value is False else value}"
+        for field, value in patient_data.items()
+        if value is not None
+    ]
+
+    return ", ".join(known) if known else "none"
+
+
+# ==============================
+# RELEVANCE
+# ==============================
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?;:])\s+|\n+")
+_WORD = re.compile(r"[a-z]+")
+
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "is",
+    "are", "was", "be", "by", "at", "as", "if", "it", "this", "that", "has",
+    "have", "had", "not", "no", "yes", "year", "years", "old", "month", "months",
+    "child", "my", "his", "her", "their", "very", "some",
+}
+
+
+def _terms(text):
+    return {w for w in _WORD.findall(text.lower()) if len(w) > 2 and w not in _STOPWORDS}
+
+
+def query_terms(rule_result, patient_data, raw_text):
+    """
+    Words an evidence sentence should share to be worth its tokens: the
+    matched classifications and modules, the positive findings, and the
+    user's own wording.
+    """
+
+    terms = set()
+
+    for c in rule_result["classifications"]:
+        terms |= _terms((c["condition"] or "").replace("_", " "))
+        terms |= _terms((c["module"] or "").replace("_", " "))
+
+    for field, value in patient_data.items():
+        if value is True:
+            terms |= _terms(field.replace("_", " "))
+
+    return terms | _terms(raw_text)
+
+
+def _normalize(sentence):
+    return " ".join(_WORD.findall(sentence.lower()))
+
+
+# ==============================
+# PACKER
+# ==============================
+
+def pack_evidence(docs, terms, budget_tokens):
+    """
+    Build an evidence block of at most `budget_tokens` from retrieved docs.
+
+    Chunks are split into sentences; sentences seen before (adjacent chunks
+    share a 150-character overlap) are dropped, the rest are scored by term
+    overlap with a small bonus for higher-ranked docs, and the best ones are
+    kept in their original reading order.
+
+    Returns (evidence_text, stats).
+    """
+
+    seen = set()
+    candidates = []
+
+    for rank, doc in enumerate(docs):
+        for sentence in _SENTENCE_SPLIT.split(doc.page_content):
+            sentence = " ".join(sentence.split())
+            key = _normalize(sentence)
+
+            if len(key) < 12 or key in seen:
+                continue
+
+            # Overlap cuts mid-sentence: also drop fragments of a kept sentence
+            if any(key in other for other in seen):
+                continue
+
+            seen.add(key)
+
+            overlap = len(terms & _terms(sentence))
+            score = overlap + 0.5 / (rank + 1) if overlap else 0.0
+
+            candidates.append((score, len(candidates), sentence))
+
+    used = 0
+    chosen = []
+
+    for score, order, sentence in sorted(candidates, key=lambda c: (-c[0], c[1])):
+        if score <= 0 and chosen:
+            break
+
+        cost = estimate_tokens(sentence) + 1
+
+        if used + cost > budget_tokens:
+            continue
+
+        chosen.append((order, sentence))
+        used += cost
+
+    evidence = "\n".join(sentence for _, sentence in sorted(chosen))
+
+    return evidence, {
+        "sentences_kept": len(chosen),
+        "sentences_seen": len(candidates),
+        "evidence_tokens": used
+    }
@@ -0,0 +1,288 @@
+import re
+
+from session import PATIENT_FIELDS
+
+
+# ==============================
+# PATTERNS
+# ==============================
+
+_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11,
+    "twelve": 12, "eighteen": 18, "twenty": 20, "twenty-four": 24,
+}
+
+_NUM = r"(\d+(?:\.\d+)?|" + "|".join(sorted(_NUMBER_WORDS, key=len, reverse=True)) + r")"
+
+# Months per unit
+_AGE_UNITS = (
+    (r"y(?:ea)?rs?|y/?o|yo", 12.0),
+    (r"mo(?:nth)?s?|mths?", 1.0),
+    (r"w(?:ee)?ks?", 12.0 / 52.0),
+    (r"days?", 12.0 / 365.0),
+)
+
+_AGE_PART = re.compile(
+    r"\b" + _NUM + r"\s*-?\s*(" + "|".join(unit for unit, _ in _AGE_UNITS) + r")\b(?:\s*-?\s*old)?",
+    re.IGNORECASE
+)
+
+# "fever for 3 days" is a duration, not an age
+_DURATION_BEFORE = re.compile(r"\b(?:for|since|past|last|over|x)\s*$", re.IGNORECASE)
+_DURATION = re.compile(
+    r"\b(?:for|since|past|last|over|x)\s*" + _NUM + r"\s*(?:days?|w(?:ee)?ks?|mo(?:nth)?s?|hours?|hrs?)\b",
+    re.IGNORECASE
+)
+
+_RESPIRATORY_RATE = (
+    re.compile(
+        r"\b(?:rr|resp(?:iratory)?\.?\s*rate|breathing\s*rate)\s*(?:of|is|was|=|:)?\s*(\d{1,3})\b",
+        re.IGNORECASE
+    ),
+    re.compile(r"\b(\d{1,3})\s*(?:breaths?\s*(?:per|/|a)\s*min(?:ute)?|/\s*min)\b", re.IGNORECASE),
+)
+
+_SYMPTOMS = {
+    "cough": re.compile(r"\bcough(?:s|ing|ed)?\b", re.IGNORECASE),
+    "fever": re.compile(r"\b(?:fever(?:ish)?|febrile|pyrexi(?:a|al)|high\s*temperature)\b", re.IGNORECASE),
+    "chest_indrawing": re.compile(
+        r"\b(?:(?:lower\s*)?chest\s*(?:wall\s*)?in-?\s*drawing|indrawing|subcostal\s*retractions?)\b",
+        re.IGNORECASE
+    ),
+    # Not a bare "fit": "fit and well"
+    "convulsions": re.compile(r"\b(?:convuls\w*|seizures?|fits|fitting)\b", re.IGNORECASE),
+}
+
+# Negation cue anywhere earlier in the same clause ("no cough or fever")
+_NEGATION_BEFORE = re.compile(
+    r"\b(?:no|not|non|never|nil|denies|denied|without|negative\s*for|absence\s*of|free\s*of|"
+    r"hasn'?t|hasnt|doesn'?t|doesnt|didn'?t|didnt|isn'?t|isnt)\b",
+    re.IGNORECASE
+)
+
+# Explicit answer right after the term ("cough: no", "fever - yes",
+# "cough? no"). A bare +/- only counts when it ends the clause: in
+# "cough - 2 months old" the dash is punctuation, not an answer.
+_ANSWER_AFTER = re.compile(
+    r"^\s*[:=\-?]?\s*(yes|y|present|positive|no|n|none|absent|negative|nil|[+\-](?=\s*$))(?![\w])",
+    re.IGNORECASE
+)
+_NEGATIVE_ANSWERS = {"no", "n", "none", "absent", "negative", "nil", "-"}
+
+# Negation after the term ("convulsions not present", "convulsions: not")
+_NEGATION_AFTER = re.compile(
+    r"^\s*[:=\-]?\s*(?:(?:is|was|were|are|has|have)\s+)?(?:not|never)\s+"
+    r"(?:present|seen|noted|observed|found|reported)\b"
+    r"|^\s*[:=\-]?\s*(?:not|never)\s*$",
+    re.IGNORECASE
+)
+
+# "cough?" with no answer after it is a question, not a finding
+_UNANSWERED = re.compile(r"^\s*\?")
+
+# A sign attributed to someone else ("mother has a cough") is not the
+# child's; such clauses are left to the LLM
+_OTHER_PERSON = re.compile(
+    r"\b(?:mother|mum|mom|father|dad|parents?|sister|brother|siblings?|twin|"
+    r"grand(?:mother|father|ma|pa)|aunt|uncle|cousin|neighbou?r|classmates?|"
+    r"family|household|friend)s?\b",
+    re.IGNORECASE
+)
+
+# Clause boundaries: negation does not cross these
+_CLAUSE_SPLIT = re.compile(
+    r"[,.;\n]|\b(?:but|however|although|though|whereas)\b|\band\s+(?=(?:has|have|had|is|with)\b)",
+    re.IGNORECASE
+)
+
+# Words that carry no clinical content for the six fields. Negation and
+# answer words are not filler: they count as consumed only where a parser
+# read them, so a stray "not" sends the text to the LLM.
+_FILLER = {
+    "a", "an", "the", "and", "or", "with", "has", "have", "had", "is", "was", "are",
+    "of", "for", "since", "also", "old", "aged", "age", "child", "baby", "infant",
+    "boy", "girl", "son", "daughter", "kid", "toddler", "patient", "pt", "he", "she",
+    "they", "it", "my", "our", "his", "her", "their", "presents", "presenting",
+    "presented", "complains", "complaining", "history", "hx", "c/o", "any", "yes",
+    "but", "however", "today", "brought", "in", "by",
+    "reports", "per", "min", "minute", "breaths", "breath",
+    "at", "rate", "male", "female", "m", "f", "day", "days",
+}
+
+
+# ==============================
+# PARSERS
+# ==============================
+
+def _number(token):
+    token = token.lower()
+    if token in _NUMBER_WORDS:
+        return float(_NUMBER_WORDS[token])
+    return float(token)
+
+
+def _unit_months(unit):
+    for pattern, months in _AGE_UNITS:
+        if re.fullmatch(pattern, unit, re.IGNORECASE):
+            return months
+    return None
+
+
+def parse_age_months(text, spans):
+    """
+    Age in whole months from "18 months", "2 yrs", "1 year 6 months",
+    "6 weeks old". Consecutive parts ("1 year 6 months") are summed; two
+    separate ages make the text ambiguous and return None.
+    """
+
+    parts = []
+
+    for match in _AGE_PART.finditer(text):
+        if _DURATION_BEFORE.search(text[:match.start()]):
+            continue
+
+        # Weeks/days only count as an age when stated as "... old"
+        if _unit_months(match.group(2)) < 1 and not match.group(0).lower().endswith("old"):
+            continue
+
+        parts.append(match)
+
+    if not parts:
+        return None
+
+    groups = [[parts[0]]]
+
+    for match in parts[1:]:
+        gap = text[groups[-1][-1].end():match.start()]
+        if re.fullmatch(r"\s*(?:and|,)?\s*", gap, re.IGNORECASE):
+            groups[-1].append(match)
+        else:
+            groups.append([match])
+
+    if len(groups) > 1:
+        return None
+
+    months = 0.0
+    for match in groups[0]:
+        months += _number(match.group(1)) * _unit_months(match.group(2))
+        spans.append(match.span())
+
+    return int(round(months)) if months >= 1 else int(months)
+
+
+def parse_respiratory_rate(text, spans):
+    """The stated rate, and {"respiratory_rate"} as conflicts if two differ."""
+
+    values = set()
+
+    for pattern in _RESPIRATORY_RATE:
+        for match in pattern.finditer(text):
+            values.add(int(match.group(1)))
+            spans.append(match.span())
+
+    # Conflicting rates are left to the LLM
+    if len(values) > 1:
+        return None, {"respiratory_rate"}
+
+    return (values.pop() if values else None), set()
+
+
+def _clauses(text):
+    start = 0
+    for match in _CLAUSE_SPLIT.finditer(text):
+        yield start, match.start()
+        start = match.end()
+    yield start, len(text)
+
+
+def parse_symptoms(text, spans):
+    """yes/no for each symptom mentioned, with clause-scoped negation."""
+
+    found = {}
+    conflicts = set()
+
+    for clause_start, clause_end in _clauses(text):
+        clause = text[clause_start:clause_end]
+
+        if _OTHER_PERSON.search(clause):
+            continue
+
+        for field, pattern in _SYMPTOMS.items():
+            for match in pattern.finditer(clause):
+                after = clause[match.end():]
+                answer = _ANSWER_AFTER.match(after)
+                negated_after = None if answer else _NEGATION_AFTER.match(after)
+
+                if not answer and not negated_after and _UNANSWERED.match(after):
+                    continue
+
+                if answer:
+                    value = answer.group(1).lower() not in _NEGATIVE_ANSWERS
+                    spans.append((clause_start + match.end(), clause_start + match.end() + answer.end()))
+                elif negated_after:
+                    value = False
+                    spans.append((clause_start + match.end(), clause_start + match.end() + negated_after.end()))
+                else:
+                    cues = list(_NEGATION_BEFORE.finditer(clause[:match.start()]))
+                    value = not cues
+
+                    if cues:
+                        spans.append((clause_start + cues[-1].start(), clause_start + cues[-1].end()))
+
+                spans.append((clause_start + match.start(), clause_start + match.end()))
+
+                if field in found and found[field] != value:
+                    conflicts.add(field)
+                found[field] = value
+
+    for field in conflicts:
+        del found[field]
+
+    return found, conflicts
+
+
+def _residual_words(text, spans):
+    chars = list(text)
+    for start, end in spans:
+        for i in range(start, end):
+            chars[i] = " "
+
+    return [
+        word for word in re.findall(r"[a-z0-9][a-z0-9/'.]*", "".join(chars).lower())
+        if word.rstrip(".") not in _FILLER
+    ]
+
+
+# ==============================
+# MAIN EXTRACTOR
+# ==============================
+
+def fast_extract(text):
+    """
+    Deterministic extraction of the session fields from free text.
+
+    Returns (fields, complete): `fields` only contains values parsed with
+    certainty, and `complete` is True only when every token of the text
+    was consumed by a parser or is filler, i.e. the LLM could not add or
+    correct anything.
+    """
+
+    spans = [match.span() for match in _DURATION.finditer(text)]
+    fields = {}
+
+    age = parse_age_months(text, spans)
+    if age is not None:
+        fields["age_months"] = age
+
+    rate, conflicts = parse_respiratory_rate(text, spans)
+    if rate is not None:
+        fields["respiratory_rate"] = rate
+
+    symptoms, symptom_conflicts = parse_symptoms(text, spans)
+    fields.update(symptoms)
+    conflicts |= symptom_conflicts
+
+    complete = bool(fields) and not conflicts and not _residual_words(text, spans)
+
+    return {k: v for k, v in fields.items() if k in PATIENT_FIELDS}, complete
@@ -0,0 +1,219 @@
+import json
+import re
+
+from session import PATIENT_FIELDS, NUMERIC_FIELDS
+from fast_extractor import parse_age_months
+
+
+# ==============================
+# INCREMENTAL SCANNER
+# ==============================
+
+class JSONObjectScanner:
+    """
+    Finds the first top-level JSON object in a token stream.
+
+    `feed()` each chunk as it arrives; it returns True as soon as the
+    object's closing brace has been seen, so the caller can stop
+    generation instead of waiting for trailing chatter. Anything before the
+    first "{" (preamble, code fence) is skipped; `text` holds the object.
+    """
+
+    __slots__ = ("_parts", "_open", "_in_string", "_escape", "done")
+
+    def __init__(self):
+        self._parts = []
+        self._open = []
+        self._in_string = False
+        self._escape = False
+        self.done = False
+
+    @property
+    def text(self):
+        return "".join(self._parts)
+
+    def closing(self):
+        """Characters that would close everything still open."""
+        return ('"' if self._in_string else "") + "".join(
+            "}" if ch == "{" else "]" for ch in reversed(self._open)
+        )
+
+    def feed(self, chunk):
+        if self.done:
+            return True
+
+        start = 0
+
+        if not self._open:
+            start = chunk.find("{")
+            if start < 0:
+                return False
+
+        for i in range(start, len(chunk)):
+            ch = chunk[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._open.append(ch)
+            elif ch in "}]":
+                self._open.pop()
+
+                if not self._open:
+                    self._parts.append(chunk[start:i + 1])
+                    self.done = True
+                    return True
+
+        self._parts.append(chunk[start:])
+        return False
+
+
+# ==============================
+# REPAIR
+# ==============================
+
+_FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_BARE_WORD = re.compile(r"\b(True|False|None)\b")
+_UNQUOTED_KEY = re.compile(r"([{,]\s*)([A-Za-z_][A-Za-z0-9_]*)(\s*:)")
+
+
+def _outside_strings(text, fix):
+    """Apply `fix` to the parts of `text` that are not inside "strings"."""
+
+    parts = re.split(r'("(?:[^"\\]|\\.)*")', text)
+    return "".join(part if i % 2 else fix(part) for i, part in enumerate(parts))
+
+
+def repair_json(text):
+    """
+    Fix the defects small models commonly produce: code fences, text around
+    the object, trailing commas, Python literals, single-quoted strings,
+    unquoted keys and a missing closing brace.
+    """
+
+    text = _FENCE.sub("", text).strip()
+
+    start = text.find("{")
+    if start < 0:
+        return text
+
+    scanner = JSONObjectScanner()
+    scanner.feed(text[start:])
+    text = scanner.text
+
+    if not scanner.done:
+        # Truncated output: close what is open
+        closing = scanner.closing()
+        text = text if closing.startswith('"') else text.rstrip().rstrip(",")
+        text += closing
+
+    if '"' not in text:
+        text = text.replace("'", '"')
+
+    def fix(part):
+        part = _TRAILING_COMMA.sub(r"\1", part)
+        part = _BARE_WORD.sub(lambda m: _PY_LITERALS[m.group(1)], part)
+        return _UNQUOTED_KEY.sub(r'\1"\2"\3', part)
+
+    return _outside_strings(text, fix)
+
+
+def parse_json_object(text):
+    """The first JSON object in `text` as a dict (repaired if needed), or None."""
+
+    try:
+        value = json.loads(text)
+    except (TypeError, ValueError):
+        try:
+            value = json.loads(repair_json(text))
+        except (TypeError, ValueError):
+            return None
+
+    return value if isinstance(value, dict) else None
+
+
+# ==============================
+# SCHEMAS
+# ==============================
+
+_TRUE = {"true", "yes", "y", "present", "positive", "1"}
+_FALSE = {"false", "no", "n", "absent", "negative", "none", "0"}
+
+
+def _as_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in _TRUE:
+            return True
+        if value in _FALSE:
+            return False
+    return None
+
+
+def _as_number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        match = re.search(r"\d+(?:\.\d+)?", value)
+        if match:
+            number = float(match.group())
+            return int(number) if number.is_integer() else number
+    return None
+
+
+def validate_extraction(data):
+    """
+    Keep only TriageSession fields, coerced to their types (numbers for
+    NUMERIC_FIELDS, booleans otherwise); unusable values are dropped.
+    """
+
+    fields = {}
+
+    for field in PATIENT_FIELDS:
+        if field not in data or data[field] is None:
+            continue
+
+        value = data[field]
+
+        if field == "age_months" and isinstance(value, str) and re.search(r"[a-z]", value, re.I):
+            # "2 years" is 24 months, not 2
+            value = parse_age_months(value, [])
+        elif field in NUMERIC_FIELDS:
+            value = _as_number(value)
+        else:
+            value = _as_bool(value)
+
+        if value is not None:
+            fields[field] = value
+
+    return fields
+
+
+def validate_explanation(data):
+    """risk_level/explanation as strings, follow_up_questions as a list of strings."""
+
+    questions = data.get("follow_up_questions") or []
+
+    if isinstance(questions, str):
+        questions = [questions]
+
+    return {
+        "risk_level": str(data.get("risk_level", "")),
+        "explanation": str(data.get("explanation", "")).strip(),
+        "follow_up_questions": [str(q) for q in questions if q]
+    }
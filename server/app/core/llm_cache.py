@@ -0,0 +1,193 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def template_hash(template):
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+
+def prompt_key(model, template_id, prompt):
+    digest = hashlib.sha256()
+    for part in (model, template_id, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# ----------------------------------------
+# Disk-Backed Prompt → Response Cache
+# ----------------------------------------
+
+class LLMCache:
+    """
+    SQLite cache of deterministic (temperature=0) LLM responses.
+
+    Keys are sha256(model, template hash, rendered prompt). Every entry also
+    records its model and template hash, and `retain()` deletes rows that do
+    not belong to the current model/templates, so changing either one never
+    serves stale text and never leaves dead rows behind. Entries older than
+    `ttl_seconds` are treated as misses; past `max_entries` the least
+    recently used rows are dropped, down to `evict_to` of the limit so that
+    eviction runs once per batch of inserts rather than on every one.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_entries=10000, evict_to=0.9):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.evict_to = evict_to
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        # One connection shared by the event loop and executor threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                template TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_used_at ON llm_cache (used_at)")
+
+        # Row count tracked in memory: no COUNT(*) per insert
+        self._size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    # ----------------------------------------
+    # Lookup / Store
+    # ----------------------------------------
+
+    def get(self, model, template_id, prompt):
+        key = prompt_key(model, template_id, prompt)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            response, created_at = row
+
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._size -= 1
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE llm_cache SET used_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+
+        return response
+
+    def put(self, model, template_id, prompt, response):
+        key = prompt_key(model, template_id, prompt)
+        now = time.time()
+
+        with self._lock:
+            replaced = self._conn.execute(
+                "UPDATE llm_cache SET model = ?, template = ?, response = ?, created_at = ?, used_at = ? "
+                "WHERE key = ?",
+                (model, template_id, response, now, now, key)
+            ).rowcount
+
+            if not replaced:
+                self._conn.execute(
+                    "INSERT INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, template_id, response, now, now)
+                )
+                self._size += 1
+
+            if self._size > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        excess = self._size - int(self.max_entries * self.evict_to)
+
+        evicted = self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN "
+            "(SELECT key FROM llm_cache ORDER BY used_at LIMIT ?)",
+            (excess,)
+        ).rowcount
+
+        self.evictions += evicted
+
+        # Resync: another process may share the file
+        self._size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    # ----------------------------------------
+    # Invalidation
+    # ----------------------------------------
+
+    def retain(self, model, template_ids):
+        """Drop every entry not produced by `model` with one of `template_ids`."""
+
+        template_ids = list(template_ids)
+        placeholders = ",".join("?" * len(template_ids))
+
+        with self._lock:
+            removed = self._conn.execute(
+                f"DELETE FROM llm_cache WHERE model != ? OR template NOT IN ({placeholders})",
+                [model, *template_ids]
+            ).rowcount
+
+            if self.ttl_seconds is not None:
+                removed += self._conn.execute(
+                    "DELETE FROM llm_cache WHERE created_at < ?",
+                    (time.time() - self.ttl_seconds,)
+                ).rowcount
+
+            self._size -= removed
+
+        if removed:
+            self.invalidations += removed
+            logger.info("🗑️ LLM cache: dropped %d stale entries", removed)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._size = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "size": self._size,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,268 @@
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from evidence import estimate_tokens
+
+
+# ==============================
+# PROMETHEUS PRIMITIVES
+# ==============================
+
+# Stage latencies range from microseconds (rules) to a minute (CPU LLM)
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+
+    if not pairs:
+        return ""
+
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus text format."""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+
+        with self._lock:
+            series = sorted(
+                (labels, list(counts), total, count)
+                for labels, (counts, total, count) in self._series.items()
+            )
+
+        for labels, counts, total, count in series:
+            cumulative = 0
+
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = _format_labels(self.labelnames, labels, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+
+            plain = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{plain} {_format_value(total)}")
+            lines.append(f"{self.name}_count{plain} {count}")
+
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+
+        with self._lock:
+            values = sorted(self._values.items())
+
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+
+        return lines
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+
+        for metric in self._metrics:
+            lines.extend(metric.render())
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "triage_stage_seconds",
+    "Time spent in each TriageBrain stage.",
+    labelnames=("stage",)
+))
+
+LLM_PROMPT_TOKENS = REGISTRY.register(Histogram(
+    "triage_llm_prompt_tokens",
+    "Estimated prompt tokens per model call (cache misses only).",
+    labelnames=("template",),
+    buckets=TOKEN_BUCKETS
+))
+
+LLM_COMPLETION_TOKENS = REGISTRY.register(Histogram(
+    "triage_llm_completion_tokens",
+    "Estimated completion tokens per model call (cache misses only).",
+    labelnames=("template",),
+    buckets=TOKEN_BUCKETS
+))
+
+LLM_CALLS = REGISTRY.register(Counter(
+    "triage_llm_calls_total",
+    "Model calls by template and whether the LLM cache answered them.",
+    labelnames=("template", "cached")
+))
+
+
+# ==============================
+# PER-REQUEST TRACES
+# ==============================
+
+class RequestTrace:
+    """Spans recorded while one request is handled (for the debug header)."""
+
+    __slots__ = ("started", "spans", "tokens")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self.tokens = {}
+
+    def add(self, stage, seconds):
+        # list.append is atomic, so executor threads can record too
+        self.spans.append((stage, seconds))
+
+    def breakdown(self):
+        """{stage: {"ms", "count"}} plus the total so far."""
+
+        stages = {}
+
+        for stage, seconds in self.spans:
+            entry = stages.setdefault(stage, {"ms": 0.0, "count": 0})
+            entry["ms"] += 1000 * seconds
+            entry["count"] += 1
+
+        for entry in stages.values():
+            entry["ms"] = round(entry["ms"], 2)
+
+        stages["total"] = {"ms": round(1000 * (time.perf_counter() - self.started), 2), "count": 1}
+        return stages
+
+    def server_timing(self):
+        """Value for a `Server-Timing` response header."""
+
+        return ", ".join(
+            f"{stage};dur={entry['ms']}" + (f';desc="x{entry["count"]}"' if entry["count"] > 1 else "")
+            for stage, entry in self.breakdown().items()
+        )
+
+
+_current_trace = contextvars.ContextVar("triage_trace", default=None)
+
+
+@contextmanager
+def trace_request():
+    """Collect the spans recorded inside the block (and tasks it starts)."""
+
+    trace = RequestTrace()
+    token = _current_trace.set(trace)
+
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def record_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage)
+
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def span(stage):
+    """Time the enclosed block as `stage` (histogram + current trace)."""
+
+    started = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def record_llm_call(template, prompt, completion=None):
+    """Count a model call; token counts only when the model actually ran."""
+
+    LLM_CALLS.inc(1, template, "false" if completion is not None else "true")
+
+    if completion is None:
+        return
+
+    prompt_tokens = estimate_tokens(prompt)
+    completion_tokens = estimate_tokens(completion)
+
+    LLM_PROMPT_TOKENS.observe(prompt_tokens, template)
+    LLM_COMPLETION_TOKENS.observe(completion_tokens, template)
+
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.tokens[f"{template}_prompt"] = trace.tokens.get(f"{template}_prompt", 0) + prompt_tokens
+        trace.tokens[f"{template}_completion"] = (
+            trace.tokens.get(f"{template}_completion", 0) + completion_tokens
+        )
@@ -0,0 +1,350 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import Counter, OrderedDict
+
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+# ==============================
+# RULE RESULT → CHUNK METADATA
+# ==============================
+
+# Values written by builders/metadata_extractor.py
+
+# Rule `module` → chunk `symptom_category`
+MODULE_CATEGORIES = {
+    "general": "danger_sign",
+    "danger_sign": "danger_sign",
+    "cough": "cough",
+    "pneumonia": "cough",
+    "fever": "fever",
+    "malaria": "fever",
+    "diarrhea": "diarrhea",
+    "diarrhoea": "diarrhea",
+    "dehydration": "diarrhea",
+    "ear": "ear",
+    "nutrition": "nutrition",
+    "malnutrition": "nutrition",
+}
+
+# Rule `severity` → chunk `severity_hint`
+SEVERITY_HINTS = {
+    "High": "severe",
+    "Moderate": "some",
+    "Medium": "some",
+    "Low": "none",
+}
+
+# Patient field → chunk `symptom_category` (used when no rule matched)
+FIELD_CATEGORIES = {
+    "cough": "cough",
+    "chest_indrawing": "cough",
+    "respiratory_rate": "cough",
+    "fever": "fever",
+    "convulsions": "danger_sign",
+}
+
+
+def age_group(age_months):
+    if age_months is None:
+        return None
+    if age_months < 2:
+        return "0-2_months"
+    if age_months < 60:
+        return "2m-5y"
+    return None
+
+
+def _where(clauses):
+    clauses = [c for c in clauses if c]
+
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
+def retrieval_filters(rule_result, patient_data):
+    """
+    Chroma `where` clauses from most to least specific: category + age
+    group + severity, category + age group, category alone, then None
+    (unfiltered). Chunks tagged "general" (or "unknown" severity) always
+    pass, since they apply to every child.
+    """
+
+    categories = {
+        MODULE_CATEGORIES[c["module"]]
+        for c in rule_result["classifications"]
+        if c["module"] in MODULE_CATEGORIES
+    }
+
+    if not categories:
+        categories = {
+            category for field, category in FIELD_CATEGORIES.items()
+            if patient_data.get(field) is True
+        }
+
+    hints = {
+        SEVERITY_HINTS[c["severity"]]
+        for c in rule_result["classifications"]
+        if c["severity"] in SEVERITY_HINTS
+    }
+
+    group = age_group(patient_data.get("age_months"))
+
+    category = (
+        {"symptom_category": {"$in": sorted(categories | {"general"})}}
+        if categories else None
+    )
+    age = {"age_group": {"$in": [group, "general"]}} if group else None
+    severity = {"severity_hint": {"$in": sorted(hints | {"unknown"})}} if hints else None
+
+    ladder = []
+
+    for where in (
+        _where([category, age, severity]),
+        _where([category, age]),
+        _where([category]),
+        None
+    ):
+        if where not in ladder:
+            ladder.append(where)
+
+    return ladder
+
+
+# ==============================
+# FILTERED RETRIEVER
+# ==============================
+
+class EvidenceRetriever:
+    """
+    Similarity search over the handbook, restricted by the rule result.
+
+    The query is embedded once; each rung of `retrieval_filters` is then
+    searched with that vector until at least `min_hits` chunks are found,
+    topping up from broader rungs (down to unfiltered) when a filter is too
+    narrow.
+    """
+
+    def __init__(self, db, embeddings, k=5, min_hits=3):
+        self.db = db
+        self.embeddings = embeddings
+        self.k = k
+        self.min_hits = min_hits
+
+        self._lock = threading.Lock()
+        self.levels = Counter()
+
+    def embed(self, text):
+        with span("embedding"):
+            return self.embeddings.embed_query(text)
+
+    def search(self, query_vector, rule_result, patient_data):
+        ladder = retrieval_filters(rule_result, patient_data)
+
+        docs = []
+        seen = set()
+
+        for level, where in enumerate(ladder):
+            kwargs = {"filter": where} if where is not None else {}
+
+            with span("similarity_search"):
+                hits = self.db.similarity_search_by_vector(query_vector, k=self.k, **kwargs)
+
+            for doc in hits:
+                if doc.page_content not in seen:
+                    seen.add(doc.page_content)
+                    docs.append(doc)
+
+            if len(docs) >= self.min_hits:
+                break
+
+        with self._lock:
+            self.levels["unfiltered" if where is None else f"level_{level}"] += 1
+
+        logger.debug("🔍 Retrieved %d chunks with filter %s", len(docs), where)
+
+        return docs[:self.k]
+
+    def retrieve(self, text, rule_result, patient_data):
+        return self.search(self.embed(text), rule_result, patient_data)
+
+    def stats(self):
+        with self._lock:
+            return {"k": self.k, "min_hits": self.min_hits, "served_by": dict(self.levels)}
+
+
+# ==============================
+# CLASSIFICATION-KEYED CACHE
+# ==============================
+
+AGE_GROUPS = ("0-2_months", "2m-5y", None)
+
+# Representative age per group, used to pre-warm the cache
+_GROUP_AGES = {"0-2_months": 1, "2m-5y": 24, None: None}
+
+
+def vector_store_version(persist_dir):
+    """Content signature of a Chroma persist directory (sizes + mtimes)."""
+
+    digest = hashlib.sha256()
+
+    for root, dirs, files in os.walk(persist_dir):
+        dirs.sort()
+
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            digest.update(f"{os.path.relpath(path, persist_dir)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+
+    return digest.hexdigest()[:16]
+
+
+def classification_query(rule_result):
+    """Canonical retrieval query for a set of matched classifications."""
+
+    terms = []
+
+    for c in sorted(rule_result["classifications"], key=lambda c: str(c["condition"])):
+        terms.append((c["condition"] or "").replace("_", " ").lower())
+        terms.append((c["module"] or "").replace("_", " "))
+
+    return " ".join(terms) + " classification treatment"
+
+
+class RetrievalCache:
+    """
+    Bounded LRU cache of retrieved evidence keyed by (matched
+    classifications, age group, rules version, vector store version).
+
+    Once rules have matched, the evidence worth showing depends on which
+    classifications fired and the age band, not on the user's wording, so
+    those requests search with `classification_query` and share one entry.
+    Requests with no matched classification are not cached (`key` returns
+    None) and keep searching with the raw text. A rule reload can change
+    a classification's module or severity, and with it the search filters,
+    so entries are per rules version.
+    """
+
+    def __init__(self, retriever, store_version=None, maxsize=256):
+        self.retriever = retriever
+        self.store_version = store_version
+        self.maxsize = maxsize
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, rule_result, patient_data):
+        if not rule_result["classifications"]:
+            return None
+
+        conditions = tuple(sorted({str(c["condition"]) for c in rule_result["classifications"]}))
+
+        return (
+            conditions,
+            age_group(patient_data.get("age_months")),
+            rule_result.get("rules_version"),
+            self.store_version
+        )
+
+    def get(self, rule_result, patient_data):
+        key = self.key(rule_result, patient_data)
+
+        with self._lock:
+            docs = self._entries.get(key)
+
+            if docs is None:
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(docs)
+
+    def retrieve(self, rule_result, patient_data):
+        docs = self.get(rule_result, patient_data)
+
+        if docs is not None:
+            return docs
+
+        with self._lock:
+            self.misses += 1
+
+        docs = self.retriever.retrieve(classification_query(rule_result), rule_result, patient_data)
+        self._store(self.key(rule_result, patient_data), docs)
+
+        return list(docs)
+
+    def _store(self, key, docs):
+        with self._lock:
+            self._entries[key] = tuple(docs)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def prewarm(self, rules):
+        """
+        Fill the single-classification entries of every rule in `rules`,
+        dropping entries of other rules versions.
+        """
+
+        with self._lock:
+            for key in [key for key in self._entries if key[2] != rules.version]:
+                del self._entries[key]
+
+        warmed = 0
+
+        for rule in rules.rules:
+            rule_result = {
+                "classifications": [{
+                    "module": rule.module,
+                    "condition": rule.classification,
+                    "severity": rule.severity
+                }],
+                "rules_version": rules.version
+            }
+
+            query_vector = None
+
+            for group in AGE_GROUPS:
+                patient_data = {"age_months": _GROUP_AGES[group]}
+                key = self.key(rule_result, patient_data)
+
+                with self._lock:
+                    if key in self._entries:
+                        continue
+
+                # One embedding per classification, one search per age group
+                if query_vector is None:
+                    query_vector = self.retriever.embed(classification_query(rule_result))
+
+                self._store(key, self.retriever.search(query_vector, rule_result, patient_data))
+                warmed += 1
+
+        logger.info("🔥 Retrieval cache pre-warmed with %d entries", warmed)
+
+        return warmed
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "store_version": self.store_version
+            }
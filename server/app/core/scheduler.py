@@ -0,0 +1,320 @@
+import asyncio
+import contextlib
+import logging
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------
+# Backends
+# ----------------------------------------
+
+class ChatModelBackend:
+    """
+    Runs a batch of prompts through a LangChain chat model with `abatch`,
+    which issues them concurrently (the Ollama server batches parallel
+    requests up to its OLLAMA_NUM_PARALLEL slots).
+    """
+
+    def __init__(self, llm, max_concurrency=None, complete=None):
+        # `llm` may also be a zero-argument callable returning the model,
+        # so that it is only loaded when the first batch runs
+        self.llm = llm
+        self.max_concurrency = max_concurrency
+
+        # Optional `async complete(prompt) -> text` used per prompt instead
+        # of `abatch` (e.g. streaming with early termination)
+        self.complete = complete
+
+        self._limit = None
+
+    async def run_batch(self, prompts):
+        if self.complete is not None:
+            return await asyncio.gather(*(self.run_one(p) for p in prompts), return_exceptions=True)
+
+        llm = self.llm if hasattr(self.llm, "abatch") else self.llm()
+
+        config = {"max_concurrency": self.max_concurrency} if self.max_concurrency else None
+        responses = await llm.abatch(prompts, config=config, return_exceptions=True)
+
+        return [r if isinstance(r, BaseException) else r.content for r in responses]
+
+    async def run_one(self, prompt):
+        """Text for one prompt, at most `max_concurrency` at a time."""
+
+        if self._limit is None:
+            self._limit = (
+                asyncio.Semaphore(self.max_concurrency) if self.max_concurrency
+                else contextlib.nullcontext()
+            )
+
+        async with self._limit:
+            if self.complete is not None:
+                return await self.complete(prompt)
+
+            llm = self.llm if hasattr(self.llm, "ainvoke") else self.llm()
+            return (await llm.ainvoke(prompt)).content
+
+
+# Any object with `async run_batch(prompts) -> list` (text or an exception
+# per prompt, in order) can be used as a backend, e.g. a fake model in tests.
+# A backend that also has `async run_one(prompt) -> text` gets each prompt
+# run as its own task, cancelled when its caller gives up.
+
+
+# ----------------------------------------
+# Scheduler
+# ----------------------------------------
+
+class _Request:
+
+    __slots__ = ("prompt", "future", "deadline", "enqueued_at")
+
+    def __init__(self, prompt, future, deadline):
+        self.prompt = prompt
+        self.future = future
+        self.deadline = deadline
+        self.enqueued_at = time.monotonic()
+
+
+class LLMScheduler:
+    """
+    Micro-batches LLM prompts submitted by concurrent sessions.
+
+    `submit()` enqueues a prompt and awaits its text. A dispatcher task
+    waits up to `batch_window` seconds after the first queued prompt (or
+    until `max_batch_size` are queued), then hands the batch to the backend.
+    At most `max_in_flight` batches run at once; while they do, new prompts
+    keep queuing, so batches grow with load. A request whose deadline passes
+    before dispatch is failed with TimeoutError and never reaches the model.
+    """
+
+    def __init__(self, backend, max_batch_size=8, batch_window=0.02, max_in_flight=2):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.max_in_flight = max_in_flight
+
+        self.requests = 0
+        self.batches = 0
+        self.expired = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = Counter()
+        self.queue_wait_total = 0.0
+
+        self._queue = None
+        self._slots = None
+        self._dispatcher = None
+        self._in_flight = set()
+
+    def _ensure_started(self):
+        # Created lazily so the scheduler binds to the loop that uses it
+        if self._dispatcher is None or self._dispatcher.done():
+            if self._dispatcher is not None and not self._dispatcher.cancelled():
+                error = self._dispatcher.exception()
+                if error is not None:
+                    logger.error("❌ LLM dispatcher died: %r; restarting", error)
+
+            # Requests queued for a dead dispatcher go to the new one
+            pending = self._drain()
+
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            self._dispatcher = asyncio.ensure_future(self._dispatch_loop())
+
+            loop = asyncio.get_running_loop()
+            for request in pending:
+                # Futures of a previous event loop cannot be resolved here
+                if request.future.get_loop() is loop:
+                    self._queue.put_nowait(request)
+
+    def _drain(self):
+        """Waiting requests still to be answered, emptying the queue."""
+
+        pending = []
+
+        while self._queue is not None and not self._queue.empty():
+            request = self._queue.get_nowait()
+            if not request.future.done():
+                pending.append(request)
+
+        return pending
+
+    # ----------------------------------------
+    # Submission
+    # ----------------------------------------
+
+    async def submit(self, prompt, timeout=None):
+        """Response text for `prompt`; TimeoutError after `timeout` seconds."""
+
+        self._ensure_started()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+        request = _Request(prompt, loop.create_future(), deadline)
+
+        self._queue.put_nowait(request)
+        self.requests += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+
+        # Cancelling the future on timeout lets the dispatcher skip it
+        return await asyncio.wait_for(request.future, timeout)
+
+    # ----------------------------------------
+    # Dispatch
+    # ----------------------------------------
+
+    async def _collect_batch(self):
+        loop = asyncio.get_running_loop()
+
+        batch = [await self._queue.get()]
+        window_end = loop.time() + self.batch_window
+
+        while len(batch) < self.max_batch_size:
+            remaining = window_end - loop.time()
+
+            if remaining <= 0:
+                break
+
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Top up with anything that queued while the window was closing
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+        return batch
+
+    async def _dispatch_loop(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            await self._slots.acquire()
+
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+
+            now = loop.time()
+            live = []
+
+            for request in batch:
+                if request.future.done():
+                    # Caller already gave up (its timeout cancelled the future)
+                    self.expired += 1
+                    continue
+
+                if request.deadline is not None and now >= request.deadline:
+                    request.future.set_exception(asyncio.TimeoutError())
+                    self.expired += 1
+                    continue
+
+                live.append(request)
+
+            if not live:
+                self._slots.release()
+                continue
+
+            task = asyncio.ensure_future(self._run_batch(live))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _run_batch(self, batch):
+        started = time.monotonic()
+
+        self.batches += 1
+        self.batch_sizes[len(batch)] += 1
+        self.queue_wait_total += sum(started - r.enqueued_at for r in batch)
+
+        try:
+            if hasattr(self.backend, "run_one"):
+                results = await self._run_each(batch)
+            else:
+                results = await self.backend.run_batch([r.prompt for r in batch])
+        except Exception as e:
+            logger.exception("❌ LLM batch of %d failed", len(batch))
+            results = [e] * len(batch)
+        finally:
+            self._slots.release()
+
+        results = list(results)
+
+        if len(results) != len(batch):
+            # Results can no longer be matched to prompts: fail them all
+            logger.error("❌ LLM backend returned %d results for %d prompts", len(results), len(batch))
+            results = [
+                RuntimeError(f"LLM backend returned {len(results)} results for {len(batch)} prompts")
+            ] * len(batch)
+
+        for request, result in zip(batch, results):
+            if request.future.done():
+                continue
+
+            if isinstance(result, BaseException):
+                self.errors += 1
+                request.future.set_exception(result)
+            else:
+                request.future.set_result(result)
+
+    async def _run_each(self, batch):
+        tasks = []
+
+        for request in batch:
+            task = asyncio.ensure_future(self.backend.run_one(request.prompt))
+
+            # submit() cancels the future when the caller's deadline passes
+            # (or the caller is cancelled): stop the generation too, so it
+            # does not keep holding the in-flight slot
+            request.future.add_done_callback(
+                lambda future, task=task: task.cancel() if future.cancelled() else None
+            )
+            tasks.append(task)
+
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self):
+        tasks = list(self._in_flight)
+
+        if self._dispatcher is not None:
+            tasks.append(self._dispatcher)
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatcher = None
+
+        for request in self._drain():
+            request.future.cancel()
+
+    # ----------------------------------------
+    # Stats
+    # ----------------------------------------
+
+    def stats(self):
+        dispatched = sum(size * count for size, count in self.batch_sizes.items())
+
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight_batches": len(self._in_flight),
+            "requests": self.requests,
+            "batches": self.batches,
+            "expired": self.expired,
+            "errors": self.errors,
+            "mean_batch_size": round(dispatched / self.batches, 3) if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "mean_queue_wait_ms": (
+                round(1000 * self.queue_wait_total / dispatched, 3) if dispatched else 0.0
+            ),
+            "max_batch_size": self.max_batch_size,
+            "batch_window": self.batch_window,
+            "max_in_flight": self.max_in_flight
+        }
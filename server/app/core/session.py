@@ -1,21 +1,45 @@
+# Structured fields collected during a consultation (extraction targets)
+PATIENT_FIELDS = (
+    "age_months",
+    "cough",
+    "fever",
+    "respiratory_rate",
+    "chest_indrawing",
+    "convulsions"
+)
+
+# Fields holding numbers; every other field is a yes/no finding
+NUMERIC_FIELDS = frozenset({"age_months", "respiratory_rate"})
+
+
 class TriageSession:
 
-    def __init__(self):
-        self.patient_data = {
-            "age_months": None,
-            "cough": None,
-            "fever": None,
-            "respiratory_rate": None,
-            "chest_indrawing": None,
-            "convulsions": None
-        }
+    # Servers keep many of these open at once: no per-instance __dict__
+    __slots__ = ("session_id", "patient_data", "status", "rule_state", "turns", "last_seen")
+
+    def __init__(self, session_id=None):
+        self.session_id = session_id
+        self.patient_data = dict.fromkeys(PATIENT_FIELDS)
 
         self.status = "incomplete"
 
+        # Incremental rule-engine state, created by TriageBrain on first use
+        self.rule_state = None
+
+        # Bookkeeping for SessionManager (idle TTL)
+        self.turns = 0
+        self.last_seen = None
+
     def update_patient_data(self, extracted_data: dict):
+        changed = []
+
         for key, value in extracted_data.items():
             if key in self.patient_data and value is not None:
+                if self.patient_data[key] != value:
+                    changed.append(key)
                 self.patient_data[key] = value
 
+        return changed
+
     def get_missing_fields(self):
         return [k for k, v in self.patient_data.items() if v is None]
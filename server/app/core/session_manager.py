@@ -0,0 +1,203 @@
+import asyncio
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from session import TriageSession
+
+
+# ----------------------------------------
+# Memory Accounting
+# ----------------------------------------
+
+def session_nbytes(session):
+    """
+    Approximate bytes held by one session: the object, its patient dict and
+    the incremental rule engine's cached scores and matches.
+    """
+
+    size = sys.getsizeof(session) + sys.getsizeof(session.patient_data)
+    size += sys.getsizeof(session.session_id)
+
+    state = session.rule_state
+
+    if state is not None:
+        size += sys.getsizeof(state) + sys.getsizeof(state.__dict__)
+        size += sys.getsizeof(state._node_scores) + sys.getsizeof(state._matches)
+        size += sum(sys.getsizeof(m) for m in state._matches if m is not None)
+
+    return size
+
+
+# ----------------------------------------
+# Session Manager
+# ----------------------------------------
+
+class SessionManager:
+    """
+    Open triage consultations keyed by session ID.
+
+    Sessions are kept in least-recently-used order, so expiring the ones
+    idle for longer than `ttl_seconds` only looks at the front of the
+    dict, and going over `max_sessions` evicts the least recently used.
+    `step()` serializes turns of the same session; different sessions run
+    concurrently.
+    """
+
+    def __init__(self, ttl_seconds=1800, max_sessions=50000):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+
+        self._sessions = OrderedDict()
+        self._sizes = {}
+        self._locks = {}
+        self.nbytes = 0
+
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    # ----------------------------------------
+    # Lifecycle
+    # ----------------------------------------
+
+    def create(self):
+        self.sweep()
+
+        session = TriageSession(uuid.uuid4().hex)
+        session.last_seen = time.monotonic()
+
+        self._sessions[session.session_id] = session
+        self._account(session)
+        self.created += 1
+
+        excess = len(self._sessions) - self.max_sessions
+
+        if excess > 0:
+            # Least recently used first; never a session that is mid-turn
+            victims = []
+
+            for session_id in self._sessions:
+                if session_id not in self._locks and session_id != session.session_id:
+                    victims.append(session_id)
+
+                    if len(victims) == excess:
+                        break
+
+            for session_id in victims:
+                self._remove(session_id)
+                self.evicted += 1
+
+        return session
+
+    def get(self, session_id):
+        """The live session, or None if unknown or idle past the TTL."""
+
+        session = self._sessions.get(session_id)
+
+        if session is None:
+            return None
+
+        now = time.monotonic()
+
+        if now - session.last_seen > self.ttl_seconds and session_id not in self._locks:
+            self._remove(session_id)
+            self.expired += 1
+            return None
+
+        session.last_seen = now
+        self._sessions.move_to_end(session_id)
+
+        return session
+
+    def delete(self, session_id):
+        if session_id in self._sessions:
+            self._remove(session_id)
+            return True
+        return False
+
+    def sweep(self):
+        """Drop sessions idle for longer than the TTL."""
+
+        cutoff = time.monotonic() - self.ttl_seconds
+        removed = 0
+
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+
+            if session.last_seen > cutoff or session_id in self._locks:
+                break
+
+            self._remove(session_id)
+            removed += 1
+
+        self.expired += removed
+        return removed
+
+    @asynccontextmanager
+    async def step(self, session_id):
+        """
+        `async with manager.step(session_id) as session:` runs one turn.
+        `session` is None for unknown or expired IDs.
+        """
+
+        session = self.get(session_id)
+
+        if session is None:
+            yield None
+            return
+
+        lock, users = self._locks.get(session_id, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._locks[session_id] = (lock, users + 1)
+
+        try:
+            async with lock:
+                yield session
+                session.turns += 1
+                session.last_seen = time.monotonic()
+        finally:
+            lock, users = self._locks[session_id]
+
+            if users == 1:
+                del self._locks[session_id]
+            else:
+                self._locks[session_id] = (lock, users - 1)
+
+            if session_id in self._sessions:
+                self._account(session)
+
+    # ----------------------------------------
+    # Accounting
+    # ----------------------------------------
+
+    def _account(self, session):
+        size = session_nbytes(session)
+        self.nbytes += size - self._sizes.get(session.session_id, 0)
+        self._sizes[session.session_id] = size
+
+    def _remove(self, session_id):
+        del self._sessions[session_id]
+        self.nbytes -= self._sizes.pop(session_id, 0)
+
+    def stats(self):
+        self.sweep()
+
+        return {
+            "active": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "in_progress": len(self._locks),
+            "approx_bytes": self.nbytes,
+            "approx_bytes_per_session": (
+                round(self.nbytes / len(self._sessions)) if self._sessions else 0
+            )
+        }
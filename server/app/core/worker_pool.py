@@ -0,0 +1,174 @@
+import asyncio
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Overloaded(Exception):
+    """Admission queue is full; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Worker pool overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _Ticket:
+
+    __slots__ = ("enqueued_at", "started_at", "released")
+
+    def __init__(self):
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        self.released = False
+
+
+class WorkerPool:
+    """
+    Bounded pool for brain calls with admission control.
+
+    At most `workers` requests run at once and at most `max_queue` wait for
+    a slot; anything beyond that is rejected immediately with `Overloaded`
+    (carrying a Retry-After estimate from the recent service time) instead
+    of queueing until it times out. `executor` is a dedicated thread pool
+    for the blocking parts of those calls (embeddings, Chroma).
+
+    Queue wait and service time are measured separately for every request.
+    """
+
+    def __init__(self, workers=4, max_queue=16, threads=None, window=1000):
+        self.workers = workers
+        self.max_queue = max_queue
+
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads or workers,
+            thread_name_prefix="brain"
+        )
+
+        self._slots = asyncio.Semaphore(workers)
+        self.waiting = 0
+        self.running = 0
+
+        self.admitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+        self._queue_waits = deque(maxlen=window)
+        self._service_times = deque(maxlen=window)
+
+    # ----------------------------------------
+    # Admission
+    # ----------------------------------------
+
+    def retry_after(self):
+        recent = list(self._service_times)[-50:]
+        service = sum(recent) / len(recent) if recent else 1.0
+
+        # Time for the current backlog to drain through the workers
+        backlog = self.waiting + self.running
+        return max(1, math.ceil(service * backlog / self.workers))
+
+    async def acquire(self):
+        """Wait for a slot; raises Overloaded when the queue is full."""
+
+        # A free slot admits right away, whatever the queue limit (even 0)
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.retry_after())
+
+        ticket = _Ticket()
+        self.waiting += 1
+
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        self.admitted += 1
+        ticket.started_at = time.monotonic()
+
+        return ticket
+
+    def release(self, ticket, failed=False):
+        """
+        Free the slot; returns {"queue_wait_ms", "service_ms"}. Releasing a
+        ticket again is a no-op (returns None), so cleanup paths can all
+        call it.
+        """
+
+        if ticket.released:
+            return None
+
+        ticket.released = True
+        finished = time.monotonic()
+
+        self.running -= 1
+        self._slots.release()
+
+        queue_wait = ticket.started_at - ticket.enqueued_at
+        service = finished - ticket.started_at
+
+        self._queue_waits.append(queue_wait)
+        self._service_times.append(service)
+
+        if failed:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+        return {
+            "queue_wait_ms": round(1000 * queue_wait, 1),
+            "service_ms": round(1000 * service, 1)
+        }
+
+    async def run(self, fn, *args):
+        """`await fn(*args)` inside a slot; returns (result, timings)."""
+
+        ticket = await self.acquire()
+
+        try:
+            result = await fn(*args)
+        except BaseException:
+            self.release(ticket, failed=True)
+            raise
+
+        return result, self.release(ticket)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # ----------------------------------------
+    # Stats
+    # ----------------------------------------
+
+    def stats(self):
+        waits = list(self._queue_waits)
+        services = list(self._service_times)
+
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "queue_wait_ms": {
+                "p50": round(1000 * _percentile(waits, 0.5), 1),
+                "p99": round(1000 * _percentile(waits, 0.99), 1)
+            },
+            "service_ms": {
+                "p50": round(1000 * _percentile(services, 0.5), 1),
+                "p99": round(1000 * _percentile(services, 0.99), 1)
+            }
+        }
@@ -0,0 +1,154 @@
+import json
+from types import SimpleNamespace
+
+
+# ----------------------------------------
+# Compiled Rule Kinds
+# ----------------------------------------
+
+ANY, ALL, MIN_COUNT, DEFAULT = range(4)
+
+_KINDS = {"ANY": ANY, "ALL": ALL, "MIN_COUNT": MIN_COUNT, "DEFAULT": DEFAULT}
+
+# IMCIKnowledgeBase field defaults
+_KB_DEFAULTS = {"version": "1.0", "source": "WHO IMCI Chart Booklet 2014"}
+
+
+def _namespace(value):
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _namespace(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_namespace(v) for v in value]
+    return value
+
+
+class ChartBookletEngine:
+    """
+    Executes an IMCIKnowledgeBase (builders/IMCI_Extractor.py schema) with
+    bitsets.
+
+    Every symptom name is interned to a bit position at load time, each
+    ClassificationRule becomes (kind, mask, min_count) and a child's
+    findings become one integer, so ANY/ALL/MIN_COUNT are a single AND,
+    compare or popcount. Rules inside a domain are pre-sorted by
+    severity_rank, so the first hit is the most severe classification.
+    """
+
+    def __init__(self, knowledge_base):
+        self.version = knowledge_base.version
+        self.source = knowledge_base.source
+        self.symptom_bits = {}
+        self.domains = []
+
+        for domain in knowledge_base.domains:
+            rules = sorted(domain.rules, key=lambda r: r.severity_rank)
+            compiled = tuple(self._compile_rule(domain, rule) for rule in rules)
+            self.domains.append((domain.id, compiled))
+
+        self.domains = tuple(self.domains)
+
+    @classmethod
+    def from_dict(cls, data):
+        # The pydantic schema lives in server/builders, which the server
+        # does not import from; the engine only reads attributes, so the
+        # plain dict (e.g. model_dump() output) is wrapped instead
+        return cls(_namespace({**_KB_DEFAULTS, **data}))
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
+
+    # ----------------------------------------
+    # Compilation
+    # ----------------------------------------
+
+    def intern(self, symptom):
+        bit = self.symptom_bits.get(symptom)
+
+        if bit is None:
+            bit = self.symptom_bits[symptom] = len(self.symptom_bits)
+
+        return bit
+
+    def _compile_rule(self, domain, rule):
+        condition = rule.condition
+        mask = 0
+
+        for symptom in condition.symptoms:
+            mask |= 1 << self.intern(symptom)
+
+        kind = _KINDS.get(condition.logic)
+        if kind is None:
+            raise ValueError(
+                f"{domain.id}/{rule.classification}: unknown logic {condition.logic!r}, "
+                f"expected one of {list(_KINDS)}"
+            )
+
+        min_count = getattr(condition, "min_count", None)
+        if min_count is None:
+            min_count = 1
+
+        result = {
+            "domain": domain.id,
+            "domain_name": domain.name,
+            "classification": rule.classification,
+            "color": rule.color,
+            "severity_rank": rule.severity_rank,
+            "treatments": tuple(rule.treatments)
+        }
+
+        return kind, mask, min_count, result
+
+    # ----------------------------------------
+    # Evaluation
+    # ----------------------------------------
+
+    def findings_mask(self, findings):
+        """
+        Pack findings into a bitmask. Accepts an iterable of present symptom
+        names or a {symptom: bool} dict; unknown symptoms are ignored.
+        """
+
+        if isinstance(findings, dict):
+            findings = [name for name, present in findings.items() if present]
+
+        bits = self.symptom_bits
+        mask = 0
+
+        for name in findings:
+            bit = bits.get(name)
+            if bit is not None:
+                mask |= 1 << bit
+
+        return mask
+
+    def evaluate_mask(self, mask):
+        matched = []
+
+        for _, rules in self.domains:
+            for kind, rule_mask, min_count, result in rules:
+
+                if kind == ANY:
+                    hit = mask & rule_mask
+                elif kind == ALL:
+                    hit = mask & rule_mask == rule_mask
+                elif kind == MIN_COUNT:
+                    hit = (mask & rule_mask).bit_count() >= min_count
+                else:
+                    hit = True
+
+                if hit:
+                    matched.append(result)
+                    break
+
+        matched.sort(key=lambda r: r["severity_rank"])
+
+        return [dict(r, treatments=list(r["treatments"])) for r in matched]
+
+    def evaluate(self, findings):
+        """
+        Highest-severity classification (with treatments) for every domain
+        that has a matching rule, most severe domain first.
+        """
+        return self.evaluate_mask(self.findings_mask(findings))
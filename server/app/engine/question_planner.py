@@ -0,0 +1,130 @@
+# ----------------------------------------
+# Score Bounds Under Missing Fields
+# ----------------------------------------
+
+def _is_unknown(node, patient):
+    return any(patient.get(field) is None for field in node.fields)
+
+
+def score_bounds(node, patient):
+    """
+    (lowest, highest) score `node` can still take once the missing fields
+    of `patient` are answered. Known sub-trees are evaluated exactly.
+    """
+
+    if node.logic in ("AND", "OR") and node.children:
+        bounds = [score_bounds(child, patient) for child in node.children]
+        lows = [low for low, _ in bounds]
+        highs = [high for _, high in bounds]
+
+        if node.logic == "AND":
+            low = min(lows) if all(s > 0 for s in lows) else 0
+            high = min(highs) if all(s > 0 for s in highs) else 0
+            return low, high
+
+        return max(lows), max(highs)
+
+    if node.fields and _is_unknown(node, patient):
+        return 0, node.max_score
+
+    score = node.score(patient)
+    return score, score
+
+
+def influential_fields(node, patient):
+    """Missing fields whose answer can still change the score of `node`."""
+
+    low, high = score_bounds(node, patient)
+
+    if low == high:
+        return set()
+
+    if node.logic in ("AND", "OR") and node.children:
+        fields = set()
+        for child in node.children:
+            fields |= influential_fields(child, patient)
+        return fields
+
+    return {field for field in node.fields if patient.get(field) is None}
+
+
+# ----------------------------------------
+# Question Planning
+# ----------------------------------------
+
+class QuestionPlan:
+    """
+    `fields`: missing fields worth asking, most decisive first.
+    `risk_fields`: the subset that can still change the overall risk level.
+    `settled`: True when no answer can change the overall risk level.
+    """
+
+    __slots__ = ("fields", "risk_fields", "settled")
+
+    def __init__(self, fields, risk_fields, settled):
+        self.fields = fields
+        self.risk_fields = risk_fields
+        self.settled = settled
+
+
+def plan_questions(rules, patient, candidates=None):
+    """
+    Rank the missing fields of `patient` by how much they can still change
+    the rule-engine outcome of the compiled rule set `rules`.
+
+    Only fields in `candidates` (default: every field the rules read) are
+    considered; fields that cannot flip any rule between matched and not
+    matched are dropped.
+    """
+
+    if candidates is None:
+        candidates = sorted(rules.fields)
+
+    order = {field: i for i, field in enumerate(candidates)}
+
+    matched = []
+    open_rules = []
+
+    for rule in rules.rules:
+        low, high = score_bounds(rule.criteria, patient)
+
+        if low > 0:
+            matched.append((rule, low < high))
+        elif high > 0:
+            open_rules.append(rule)
+
+    top_priority = min((rule.priority for rule, _ in matched), default=None)
+    top_severities = {rule.severity for rule, _ in matched if rule.priority == top_priority}
+
+    # Within the top priority tier confidence picks the winner, so a new or
+    # stronger match there matters whenever severities in the tier differ
+    def changes_risk(rule):
+        if top_priority is None or rule.priority < top_priority:
+            return True
+        return rule.priority == top_priority and len(top_severities | {rule.severity}) > 1
+
+    # Rules whose confidence (not match) is still open only matter for risk
+    pending = [(rule, changes_risk(rule)) for rule in open_rules]
+    pending += [
+        (rule, True) for rule, unsettled in matched
+        if unsettled and changes_risk(rule)
+    ]
+
+    # field -> (can change risk level, best priority, rules touched)
+    impact = {}
+
+    for rule, risk_change in pending:
+        for field in influential_fields(rule.criteria, patient):
+            if field not in order:
+                continue
+
+            risk, priority, count = impact.get(field, (False, rule.priority, 0))
+            impact[field] = (risk or risk_change, min(priority, rule.priority), count + 1)
+
+    ranked = sorted(
+        impact,
+        key=lambda f: (not impact[f][0], impact[f][1], -impact[f][2], order[f])
+    )
+    risk_fields = [field for field in ranked if impact[field][0]]
+
+    return QuestionPlan(ranked, risk_fields, settled=not risk_fields)
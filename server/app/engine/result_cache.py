@@ -0,0 +1,129 @@
+from collections import OrderedDict
+from threading import Lock
+
+from rulengine import IMCIRuleEngine
+
+
+# ----------------------------------------
+# Canonical Patient Keys
+# ----------------------------------------
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(_freeze(v) for v in value)
+    return value
+
+
+def canonical_patient(patient, fields):
+    """
+    Hashable, order-independent form of the part of `patient` the rules
+    can see. Fields the rules never read and None values (treated exactly
+    like missing ones) are dropped; the value type is kept so that e.g.
+    1 and True never share an entry.
+    """
+    key = []
+
+    for field in sorted(fields):
+        value = patient.get(field)
+
+        if value is not None:
+            key.append((field, type(value).__name__, _freeze(value)))
+
+    return tuple(key)
+
+
+def _copy_result(result):
+    return {
+        "overall_risk_level": result["overall_risk_level"],
+        "classifications": [dict(c) for c in result["classifications"]],
+        "rules_version": result["rules_version"]
+    }
+
+
+# ----------------------------------------
+# Bounded LRU Cache
+# ----------------------------------------
+
+class RuleResultCache:
+    """
+    Bounded LRU cache in front of IMCIRuleEngine.evaluate().
+
+    Keys are (rules version, canonical patient state). When a rule set with
+    a different version is seen, all entries are dropped, so edited rules
+    can never be served stale results.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def evaluate(self, rules, patient):
+        """`rules` must be a CompiledRuleSet."""
+
+        try:
+            key = (rules.version, canonical_patient(patient, rules.fields))
+            hash(key)
+        except TypeError:
+            # Unhashable field values: evaluate without caching
+            return IMCIRuleEngine(rules, patient).evaluate()
+
+        with self._lock:
+            self._check_version(rules.version)
+
+            cached = self._entries.get(key)
+
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy_result(cached)
+
+            self.misses += 1
+
+        result = IMCIRuleEngine(rules, patient).evaluate()
+
+        with self._lock:
+            if rules.version == self._version:
+                self._entries[key] = _copy_result(result)
+                self._entries.move_to_end(key)
+
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+        return result
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self._version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "rules_version": self._version
+            }
@@ -0,0 +1,444 @@
+import hashlib
+import json
+import operator as _operator
+
+
+# ----------------------------------------
+# Operator Table
+# ----------------------------------------
+
+def _contains(value, target):
+    return value in target
+
+
+def _exists(value, target):
+    return True
+
+
+COMPARATORS = {
+    "==": _operator.eq,
+    "!=": _operator.ne,
+    ">=": _operator.ge,
+    "<=": _operator.le,
+    ">": _operator.gt,
+    "<": _operator.lt,
+    "in": _contains,
+    "exists": _exists,
+}
+
+
+def _never(patient):
+    return 0
+
+
+# ----------------------------------------
+# Compiled Objects
+# ----------------------------------------
+
+class CompiledNode:
+    """
+    One node of a compiled criteria tree.
+
+    `score(patient)` is a closure with all dispatch and parsing already done;
+    `logic`, `children` and `fields` describe the tree for callers that
+    need to reason about it without re-reading the JSON. `max_score` is the
+    highest score the node can ever return, `cost` and `pass_rate` are the
+    estimates used to order children when compiling with `reorder=True`.
+    """
+
+    __slots__ = (
+        "logic", "children", "fields", "score", "source",
+        "max_score", "cost", "pass_rate",
+    )
+
+    def __init__(self, score, logic=None, children=(), fields=frozenset(), source=None,
+                 max_score=0, cost=1.0, pass_rate=0.0):
+        self.score = score
+        self.logic = logic
+        self.children = children
+        self.fields = fields
+        self.source = source
+        self.max_score = max_score
+        self.cost = cost
+        self.pass_rate = pass_rate
+
+
+class CompiledRule:
+
+    __slots__ = (
+        "id", "module", "classification", "severity", "priority",
+        "base_confidence", "criteria", "source",
+    )
+
+    def __init__(self, rule, reorder=False, sample=None):
+        self.id = rule.get("id")
+        self.module = rule.get("module")
+        self.classification = rule.get("classification")
+        self.severity = rule.get("severity")
+        self.priority = rule.get("priority", 999)
+        self.base_confidence = rule.get("base_confidence", 1.0)
+        self.criteria = compile_node(rule.get("criteria", {}), reorder, sample)
+        self.source = rule
+
+    @property
+    def fields(self):
+        return self.criteria.fields
+
+    def match(self, patient):
+        score = self.criteria.score(patient)
+
+        if score > 0:
+            return {
+                "module": self.module,
+                "condition": self.classification,
+                "severity": self.severity,
+                "priority": self.priority,
+                "confidence": round(score * self.base_confidence, 2)
+            }
+
+        return None
+
+
+class CompiledRuleSet:
+    """
+    Immutable, compiled view of an IMCI rule list.
+
+    Build it once when the rules are loaded and share it between requests;
+    every `IMCIRuleEngine` built from it skips compilation entirely.
+
+    `field_index` maps each patient field to the indexes of the rules whose
+    criteria read it, so callers can re-evaluate only what a change touches.
+    `priority_tiers` groups rule indexes by priority (most urgent first) for
+    first-match evaluation. `version` is a content hash of the source rules.
+    """
+
+    __slots__ = ("rules", "source", "fields", "field_index", "priority_tiers", "version")
+
+    def __init__(self, rules, reorder=False, sample=None):
+        self.source = list(rules)
+        self.version = rules_version(self.source)
+        self.rules = tuple(CompiledRule(rule, reorder, sample) for rule in self.source)
+        self.fields = frozenset().union(*(rule.fields for rule in self.rules))
+
+        tiers = {}
+        for i, rule in enumerate(self.rules):
+            tiers.setdefault(rule.priority, []).append(i)
+
+        self.priority_tiers = tuple(tuple(tiers[p]) for p in sorted(tiers))
+
+        field_index = {}
+        for i, rule in enumerate(self.rules):
+            for field in rule.fields:
+                field_index.setdefault(field, []).append(i)
+
+        self.field_index = {field: tuple(ids) for field, ids in field_index.items()}
+
+    def rules_reading(self, fields):
+        """Indexes (in rule order) of the rules that read any of `fields`."""
+        ids = set()
+        for field in fields:
+            ids.update(self.field_index.get(field, ()))
+        return sorted(ids)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+
+# ----------------------------------------
+# Validation
+# ----------------------------------------
+
+def validate_rules(rules):
+    """
+    Structural checks for a rule list before it is compiled and served.
+    Returns a list of human-readable errors (empty when valid).
+    """
+
+    if not isinstance(rules, list):
+        return ["'rules' must be a list"]
+
+    errors = []
+    seen_ids = set()
+
+    for i, rule in enumerate(rules):
+
+        if not isinstance(rule, dict):
+            errors.append(f"rules[{i}]: must be an object")
+            continue
+
+        where = rule.get("id") or f"rules[{i}]"
+
+        if rule.get("id") is not None:
+            if rule["id"] in seen_ids:
+                errors.append(f"{where}: duplicate id")
+            seen_ids.add(rule["id"])
+
+        for key in ("classification", "severity", "criteria"):
+            if not rule.get(key):
+                errors.append(f"{where}: missing '{key}'")
+
+        if not isinstance(rule.get("priority", 999), int):
+            errors.append(f"{where}: 'priority' must be an integer")
+
+        if not isinstance(rule.get("base_confidence", 1.0), (int, float)):
+            errors.append(f"{where}: 'base_confidence' must be a number")
+
+        if isinstance(rule.get("criteria"), dict):
+            _validate_node(rule["criteria"], f"{where}.criteria", errors)
+
+    return errors
+
+
+def _validate_node(node, where, errors):
+
+    if "logic" in node or "conditions" in node:
+
+        if node.get("logic") not in ("AND", "OR"):
+            errors.append(f"{where}: logic must be AND or OR")
+
+        conditions = node.get("conditions")
+
+        if not isinstance(conditions, list) or not conditions:
+            errors.append(f"{where}: 'conditions' must be a non-empty list")
+            return
+
+        for i, child in enumerate(conditions):
+            if not isinstance(child, dict):
+                errors.append(f"{where}.conditions[{i}]: must be an object")
+            else:
+                _validate_node(child, f"{where}.conditions[{i}]", errors)
+
+        return
+
+    if not node.get("field"):
+        errors.append(f"{where}: missing 'field'")
+
+    if node.get("operator") not in COMPARATORS:
+        errors.append(f"{where}: unknown operator {node.get('operator')!r}")
+
+    if not isinstance(node.get("weight", 1.0), (int, float)):
+        errors.append(f"{where}: 'weight' must be a number")
+
+    if "age_based" in node:
+        age_based = node["age_based"]
+
+        if not isinstance(age_based, dict) or not age_based:
+            errors.append(f"{where}: 'age_based' must be a non-empty object")
+            return
+
+        if len(parse_age_bands(age_based)) != len(age_based):
+            errors.append(f"{where}: age_based keys must look like 'min-max'")
+
+        if not all(isinstance(t, (int, float)) for t in age_based.values()):
+            errors.append(f"{where}: age_based thresholds must be numbers")
+
+
+# ----------------------------------------
+# Compiler
+# ----------------------------------------
+
+def rules_version(rules):
+    canonical = json.dumps(rules, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def compile_rules(rules, reorder=False, sample=None):
+    """
+    Compile a rule list once. With `reorder=True` the conditions of every
+    AND/OR group are reordered so short-circuiting happens as early as
+    possible; `sample` (a list of representative patient dicts) replaces
+    the default 50% pass-rate guess with measured selectivity.
+    Reordering never changes scores, only how fast they are reached.
+    """
+    if isinstance(rules, CompiledRuleSet):
+        return rules
+    return CompiledRuleSet(rules, reorder, sample)
+
+
+def compile_node(node, reorder=False, sample=None):
+
+    if not node:
+        return CompiledNode(_never, source=node)
+
+    # Logical group (AND / OR)
+    if "logic" in node and "conditions" in node:
+        return _compile_group(node, reorder, sample)
+
+    # Simple condition
+    return _measure(compile_condition(node), sample)
+
+
+def _compile_group(node, reorder, sample):
+
+    children = tuple(compile_node(cond, reorder, sample) for cond in node["conditions"])
+    fields = frozenset().union(*(child.fields for child in children))
+    logic = node["logic"]
+    cost = sum(child.cost for child in children)
+
+    if not children or logic not in ("AND", "OR"):
+        return CompiledNode(_never, logic, children, fields, node, cost=cost)
+
+    if logic == "AND":
+
+        if reorder:
+            # Cheapest, most likely to fail first
+            children = tuple(sorted(
+                children, key=lambda c: c.cost / max(1.0 - c.pass_rate, 1e-6)
+            ))
+
+        child_scores = tuple(child.score for child in children)
+        max_score = min(child.max_score for child in children)
+        max_score = max_score if max_score > 0 else 0
+
+        def score(patient):
+            lowest = None
+
+            for child in child_scores:
+                s = child(patient)
+
+                # All conditions must pass: first miss decides
+                if not s > 0:
+                    return 0
+
+                # Weakest link defines strength
+                if lowest is None or s < lowest:
+                    lowest = s
+
+            return lowest
+
+        pass_rate = 1.0
+        for child in children:
+            pass_rate *= child.pass_rate
+
+    else:
+
+        max_score = max(child.max_score for child in children)
+
+        if reorder:
+            # Children that can reach the ceiling first, cheapest and most
+            # likely to pass among them
+            children = tuple(sorted(
+                children,
+                key=lambda c: (c.max_score < max_score, c.cost / max(c.pass_rate, 1e-6))
+            ))
+
+        child_scores = tuple(child.score for child in children)
+
+        def score(patient):
+            best = None
+
+            for child in child_scores:
+                s = child(patient)
+
+                if best is None or s > best:
+                    best = s
+
+                    # Nothing later can beat the best possible weight
+                    if best >= max_score:
+                        return best
+
+            return best
+
+        fail_rate = 1.0
+        for child in children:
+            fail_rate *= 1.0 - child.pass_rate
+        pass_rate = 1.0 - fail_rate
+
+    compiled = CompiledNode(
+        score, logic, children, fields, node,
+        max_score=max_score, cost=cost, pass_rate=pass_rate
+    )
+
+    return _measure(compiled, sample)
+
+
+def _measure(node, sample):
+
+    if sample:
+        node.pass_rate = sum(1 for patient in sample if node.score(patient) > 0) / len(sample)
+
+    return node
+
+
+def compile_condition(cond):
+
+    field = cond.get("field")
+    operator = cond.get("operator")
+    weight = cond.get("weight", 1.0)
+
+    if not field or not operator:
+        return CompiledNode(_never, source=cond)
+
+    if "age_based" in cond:
+        return _compile_age_based(cond, field, weight)
+
+    compare = COMPARATORS.get(operator)
+
+    if compare is None:
+        return CompiledNode(_never, fields=frozenset((field,)), source=cond)
+
+    target = cond.get("value")
+
+    def score(patient):
+        value = patient.get(field)
+
+        # Missing field → no match
+        if value is None:
+            return 0
+
+        try:
+            return weight if compare(value, target) else 0
+        except Exception:
+            # Defensive safety
+            return 0
+
+    return CompiledNode(
+        score, fields=frozenset((field,)), source=cond,
+        max_score=max(weight, 0), cost=1.5 if operator == "in" else 1.0, pass_rate=0.5
+    )
+
+
+def parse_age_bands(age_based):
+    """Parse {"2-11": 50, ...} once into ((2, 11, 50), ...), skipping bad keys."""
+
+    bands = []
+
+    for age_range, threshold in age_based.items():
+        try:
+            min_age, max_age = map(int, age_range.split("-"))
+        except ValueError:
+            continue
+
+        bands.append((min_age, max_age, threshold))
+
+    return tuple(bands)
+
+
+def _compile_age_based(cond, field, weight):
+
+    bands = parse_age_bands(cond["age_based"])
+
+    def score(patient):
+        value = patient.get(field)
+
+        if value is None:
+            return 0
+
+        age = patient.get("age_months")
+
+        if age is None:
+            return 0
+
+        for min_age, max_age, threshold in bands:
+            if min_age <= age <= max_age:
+                return weight if value >= threshold else 0
+
+        return 0
+
+    return CompiledNode(
+        score, fields=frozenset((field, "age_months")), source=cond,
+        max_score=max(weight, 0), cost=1.0 + 0.5 * len(bands), pass_rate=0.5
+    )
@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from rule_compiler import CompiledRuleSet, compile_rules, validate_rules
+
+logger = logging.getLogger(__name__)
+
+
+class RuleRegistry:
+    """
+    Holds the live, compiled IMCI rule set and hot-reloads it from disk.
+
+    A background thread polls the rules file; a changed file is parsed,
+    validated and compiled on that thread, then swapped in with a single
+    attribute assignment. Callers read `registry.current` once at the start
+    of a request and keep using that CompiledRuleSet, so in-flight requests
+    finish on the version they started with. Invalid edits are rejected and
+    the previous version keeps serving. Listeners added with
+    `add_listener` are called with each newly swapped-in rule set.
+    """
+
+    def __init__(self, path=None, rules=None, poll_interval=2.0, reorder=True):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.reorder = reorder
+
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error = None
+        self.loaded_at = None
+
+        self._signature = None
+        self._current = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self._listeners = []
+
+        if path is not None:
+            # Fail loudly at startup; later reload failures only log
+            self._current = self._load()
+        else:
+            self._current = self._compile(rules or [])
+
+        self.loaded_at = time.time()
+
+    @classmethod
+    def from_rules(cls, rules, reorder=True):
+        """Registry over a rule list, or wrapping a CompiledRuleSet as is."""
+        return cls(rules=rules, reorder=reorder)
+
+    # ----------------------------------------
+    # Access
+    # ----------------------------------------
+
+    @property
+    def current(self):
+        return self._current
+
+    @property
+    def version(self):
+        return self._current.version
+
+    def add_listener(self, callback):
+        """Call `callback(compiled)` after every successful reload."""
+        self._listeners.append(callback)
+
+    # ----------------------------------------
+    # Loading
+    # ----------------------------------------
+
+    def _file_signature(self):
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _compile(self, rules):
+        # Already validated and compiled (e.g. shared with an engine)
+        if isinstance(rules, CompiledRuleSet):
+            return rules
+
+        errors = validate_rules(rules)
+
+        if errors:
+            raise ValueError("Invalid IMCI rules:\n  " + "\n  ".join(errors))
+
+        return compile_rules(rules, reorder=self.reorder)
+
+    def _load(self):
+        signature = self._file_signature()
+
+        with open(self.path, "r") as f:
+            rules = json.load(f).get("rules", [])
+
+        compiled = self._compile(rules)
+        self._signature = signature
+        return compiled
+
+    def reload(self):
+        """Load, validate and compile the file now. Returns True if swapped."""
+
+        if self.path is None:
+            return False
+
+        with self._reload_lock:
+            try:
+                compiled = self._load()
+            except Exception as e:
+                self.failed_reloads += 1
+                self.last_error = str(e)
+                logger.error("❌ Rule reload rejected, keeping %s: %s", self.version, e)
+                return False
+
+            self.last_error = None
+
+            if compiled.version == self._current.version:
+                return False
+
+            previous = self._current.version
+            self._current = compiled
+            self.loaded_at = time.time()
+            self.reloads += 1
+            logger.info("🔁 IMCI rules reloaded: %s → %s", previous, compiled.version)
+
+        for callback in self._listeners:
+            try:
+                callback(compiled)
+            except Exception:
+                logger.exception("❌ Rule reload listener failed")
+
+        return True
+
+    def check_for_changes(self):
+        if self.path is None:
+            return False
+
+        try:
+            signature = self._file_signature()
+        except OSError as e:
+            self.last_error = str(e)
+            return False
+
+        if signature == self._signature:
+            return False
+
+        changed = self.reload()
+
+        # Remember rejected edits too, so they are not re-parsed every poll
+        self._signature = signature
+        return changed
+
+    # ----------------------------------------
+    # File Watching
+    # ----------------------------------------
+
+    def start_watching(self):
+        if self.path is None or self._watcher is not None:
+            return
+
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, name="imci-rule-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.poll_interval + 1)
+            self._watcher = None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.check_for_changes()
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "rules": len(self._current),
+            "path": self.path,
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+            "last_error": self.last_error
+        }
@@ -1,139 +1,147 @@
+from rule_compiler import compile_condition, compile_node, compile_rules
+
+
 class IMCIRuleEngine:
 
-    def __init__(self, rules, patient):
-        self.rules = rules
+    def __init__(self, rules, patient=None, trace=False):
+        # Accepts either the raw JSON rule list or a CompiledRuleSet
+        # built once at load time (the fast path).
+        self.compiled = compile_rules(rules)
+        self.rules = self.compiled.source
         self.patient = patient
 
+        # Opt-in: attach a structured evaluation trace to every result.
+        # When off, the only cost is one attribute check per evaluate().
+        self.trace = trace
+
     # ----------------------------------------
     # Main Evaluation Entry
     # ----------------------------------------
 
-    def evaluate(self):
+    def evaluate(self, first_match=False):
+        """
+        Score every rule and aggregate the matches.
+
+        With `first_match=True` rules are visited by priority tier (most
+        urgent first) and evaluation stops after the first tier that has a
+        match: `overall_risk_level` is unchanged, but `classifications` only
+        lists that tier. A fired danger-sign rule therefore skips the rest
+        of the rule set.
+        """
+        patient = self.patient
+        rules = self.compiled.rules
         matched = []
 
-        for rule in self.rules:
-            score = self.evaluate_node(rule.get("criteria", {}))
-
-            if score > 0:
-                confidence = score * rule.get("base_confidence", 1.0)
+        if first_match:
+            for tier in self.compiled.priority_tiers:
+                for i in tier:
+                    match = rules[i].match(patient)
 
-                matched.append({
-                    "module": rule.get("module"),
-                    "condition": rule.get("classification"),
-                    "severity": rule.get("severity"),
-                    "priority": rule.get("priority", 999),
-                    "confidence": round(confidence, 2)
-                })
-
-        return self.aggregate(matched)
-
-    # ----------------------------------------
-    # Recursive Evaluator
-    # ----------------------------------------
+                    if match is not None:
+                        matched.append(match)
 
-    def evaluate_node(self, node):
+                if matched:
+                    break
 
-        if not node:
-            return 0
+        else:
+            for rule in rules:
+                match = rule.match(patient)
 
-        # Logical group (AND / OR)
-        if "logic" in node and "conditions" in node:
+                if match is not None:
+                    matched.append(match)
 
-            scores = [self.evaluate_node(cond) for cond in node["conditions"]]
+        result = self.aggregate(matched)
 
-            if not scores:
-                return 0
+        if self.trace:
+            result["trace"] = self.trace_rules()
 
-            if node["logic"] == "AND":
-                # All conditions must pass
-                if all(s > 0 for s in scores):
-                    return min(scores)  # weakest link defines strength
-                return 0
+        return result
 
-            elif node["logic"] == "OR":
-                return max(scores)
+    # ----------------------------------------
+    # Columnar Batch Evaluation
+    # ----------------------------------------
 
-            return 0
+    def evaluate_many(self, patients):
+        """
+        Evaluate a whole register at once: patient fields are packed into
+        NumPy columns and each rule's criteria run as vectorized masks.
+        Returns one `aggregate()` result per patient, in input order.
+        """
+        # NumPy is only needed for batch mode, not the per-request path
+        from vectorized import evaluate_many
 
-        # Simple condition
-        return self.evaluate_condition(node)
+        return evaluate_many(self.compiled, patients, self.aggregate)
 
     # ----------------------------------------
-    # Condition Evaluator
+    # Ad-hoc Evaluation of Raw JSON Nodes
     # ----------------------------------------
 
-    def evaluate_condition(self, cond):
-
-        field = cond.get("field")
-        operator = cond.get("operator")
-        weight = cond.get("weight", 1.0)
-
-        if not field or not operator:
-            return 0
+    def evaluate_node(self, node):
+        return compile_node(node).score(self.patient)
 
-        value = self.patient.get(field)
+    def evaluate_condition(self, cond):
+        return compile_condition(cond).score(self.patient)
 
-        # Missing field → no match
-        if value is None:
-            return 0
+    # ----------------------------------------
+    # Evaluation Traces (debug path)
+    # ----------------------------------------
 
-        # ------------------------------------
-        # Age-Based Threshold Handling
-        # ------------------------------------
+    def trace_rules(self):
+        """
+        Re-score every rule without short-circuiting and record, per rule,
+        each condition's observed value, weight and score and how AND/OR
+        groups propagated them. Slow by design; only used when tracing.
+        """
+        traces = []
+
+        for rule in self.compiled.rules:
+            criteria = self.trace_node(rule.criteria)
+            score = criteria["score"]
+
+            traces.append({
+                "rule": rule.id,
+                "condition": rule.classification,
+                "score": score,
+                "fired": score > 0,
+                "confidence": round(score * rule.base_confidence, 2) if score > 0 else 0,
+                "criteria": criteria
+            })
+
+        return traces
+
+    def trace_node(self, node):
+
+        if node.logic in ("AND", "OR") and node.children:
+            children = [self.trace_node(child) for child in node.children]
+            scores = [child["score"] for child in children]
+
+            if node.logic == "AND":
+                score = min(scores) if all(s > 0 for s in scores) else 0
+            else:
+                score = max(scores)
+
+            return {"logic": node.logic, "score": score, "children": children}
+
+        if node.logic is not None:
+            # Empty group or unsupported logic never matches
+            return {"logic": node.logic, "score": node.score(self.patient), "children": []}
+
+        cond = node.source or {}
+        entry = {
+            "field": cond.get("field"),
+            "operator": cond.get("operator"),
+            "observed": self.patient.get(cond["field"]) if cond.get("field") else None,
+            "weight": cond.get("weight", 1.0),
+            "score": node.score(self.patient)
+        }
 
         if "age_based" in cond:
-            age = self.patient.get("age_months")
-
-            if age is None:
-                return 0
-
-            for age_range, threshold in cond["age_based"].items():
-                try:
-                    min_age, max_age = map(int, age_range.split("-"))
-                except ValueError:
-                    continue
-
-                if min_age <= age <= max_age:
-                    return weight if value >= threshold else 0
-
-            return 0
-
-        # ------------------------------------
-        # Standard Comparisons
-        # ------------------------------------
-
-        target = cond.get("value")
-
-        try:
-            if operator == "==":
-                return weight if value == target else 0
-
-            elif operator == "!=":
-                return weight if value != target else 0
-
-            elif operator == ">=":
-                return weight if value >= target else 0
+            entry["age_months"] = self.patient.get("age_months")
+            entry["age_based"] = cond["age_based"]
+        else:
+            entry["value"] = cond.get("value")
 
-            elif operator == "<=":
-                return weight if value <= target else 0
-
-            elif operator == ">":
-                return weight if value > target else 0
-
-            elif operator == "<":
-                return weight if value < target else 0
-
-            elif operator == "in":
-                return weight if value in target else 0
-
-            elif operator == "exists":
-                return weight if value is not None else 0
-
-        except Exception:
-            # Defensive safety
-            return 0
-
-        return 0
+        return entry
 
     # ----------------------------------------
     # Aggregation Logic
@@ -144,7 +152,8 @@ class IMCIRuleEngine:
         if not matched:
             return {
                 "overall_risk_level": "Low",
-                "classifications": []
+                "classifications": [],
+                "rules_version": self.compiled.version
             }
 
         # Sort by priority first, then highest confidence
@@ -157,5 +166,97 @@ class IMCIRuleEngine:
 
         return {
             "overall_risk_level": highest["severity"],
-            "classifications": sorted_matches
+            "classifications": sorted_matches,
+            "rules_version": self.compiled.version
         }
+
+
+class IncrementalRuleEngine(IMCIRuleEngine):
+    """
+    Rule engine bound to one live patient dict (e.g. a TriageSession's
+    `patient_data`) that keeps every node score from the last evaluation.
+
+    `update(changed_fields)` re-scores only the rules that read a changed
+    field, and inside those rules only the sub-nodes that read it; all other
+    scores come from the cache. With `verify=True` each update is checked
+    against a full `evaluate()` (debug only, it doubles the cost).
+    """
+
+    def __init__(self, rules, patient, verify=False, trace=False):
+        super().__init__(rules, patient, trace=trace)
+        self.verify = verify
+        self._node_scores = {}
+        self._matches = [self._score_rule(rule, None) for rule in self.compiled.rules]
+
+    # ----------------------------------------
+    # Incremental Entry
+    # ----------------------------------------
+
+    def update(self, changed_fields=None):
+        """
+        Refresh cached scores after `changed_fields` were written to the
+        patient dict and return the aggregated result. `None` means
+        "unknown", which forces a full re-score.
+        """
+        rules = self.compiled.rules
+
+        if changed_fields is None:
+            self._node_scores.clear()
+            self._matches = [self._score_rule(rule, None) for rule in rules]
+        else:
+            changed = frozenset(changed_fields)
+            for i in self.compiled.rules_reading(changed):
+                self._matches[i] = self._score_rule(rules[i], changed)
+
+        result = self.aggregate([dict(m) for m in self._matches if m is not None])
+
+        if self.trace:
+            result["trace"] = self.trace_rules()
+
+        if self.verify:
+            expected = self.evaluate()
+            if result != expected:
+                raise AssertionError(
+                    f"Incremental rule result diverged from full evaluation: "
+                    f"{result} != {expected}"
+                )
+
+        return result
+
+    # ----------------------------------------
+    # Cached Node Scoring
+    # ----------------------------------------
+
+    def _score_rule(self, rule, changed):
+        score = self._score_node(rule.criteria, changed)
+
+        if score > 0:
+            return {
+                "module": rule.module,
+                "condition": rule.classification,
+                "severity": rule.severity,
+                "priority": rule.priority,
+                "confidence": round(score * rule.base_confidence, 2)
+            }
+
+        return None
+
+    def _score_node(self, node, changed):
+        key = id(node)
+
+        # Untouched sub-tree → reuse cached score
+        if changed is not None and key in self._node_scores and not (node.fields & changed):
+            return self._node_scores[key]
+
+        if node.logic in ("AND", "OR") and node.children:
+            scores = [self._score_node(child, changed) for child in node.children]
+
+            if node.logic == "AND":
+                score = min(scores) if all(s > 0 for s in scores) else 0
+            else:
+                score = max(scores)
+        else:
+            score = node.score(self.patient)
+
+        self._node_scores[key] = score
+        return score
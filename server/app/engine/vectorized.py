@@ -0,0 +1,254 @@
+from operator import is_not
+
+import numpy as np
+
+from rule_compiler import parse_age_bands
+
+
+_NUMERIC_TYPES = {bool, int, float, type(None)}
+
+
+# ----------------------------------------
+# Columnar Patient Storage
+# ----------------------------------------
+
+class PatientColumns:
+    """
+    Patient dicts packed field-by-field into NumPy columns.
+
+    Every field gets a `present` mask (value is not None). Fields whose
+    values are all bool/int/float also get a float64 column with NaN for
+    missing values; anything else (strings, lists) stays row-wise and is
+    evaluated through the scalar compiled closure instead.
+    """
+
+    def __init__(self, patients, fields):
+        self.patients = patients
+        self.size = len(patients)
+        self.present = {}
+        self.numeric = {}
+
+        for field in fields:
+            values = [patient.get(field) for patient in patients]
+            self.present[field] = np.fromiter(
+                map(is_not, values, [None] * self.size), dtype=bool, count=self.size
+            )
+
+            if set(map(type, values)) <= _NUMERIC_TYPES:
+                # NumPy maps None to NaN when casting to float64
+                self.numeric[field] = np.array(values, dtype=np.float64)
+
+    def zeros(self):
+        return np.zeros(self.size)
+
+
+# ----------------------------------------
+# Vectorized Criteria Compiler
+# ----------------------------------------
+
+def _is_number(value):
+    return type(value) in (bool, int, float)
+
+
+_VECTOR_COMPARE = {
+    "==": np.equal,
+    "!=": np.not_equal,
+    ">=": np.greater_equal,
+    "<=": np.less_equal,
+    ">": np.greater,
+    "<": np.less,
+}
+
+
+def vectorize_node(node):
+    """
+    Turn a CompiledNode into fn(PatientColumns) -> float64 score array,
+    with the exact semantics of `node.score` applied row by row.
+    """
+
+    if node.logic is not None:
+        return _vectorize_group(node)
+
+    cond = node.source
+
+    if not cond or not node.fields:
+        return lambda cols: cols.zeros()
+
+    if "age_based" in cond:
+        return _vectorize_age_based(node)
+
+    return _vectorize_condition(node)
+
+
+def _vectorize_group(node):
+
+    children = [vectorize_node(child) for child in node.children]
+
+    if not children or node.logic not in ("AND", "OR"):
+        return lambda cols: cols.zeros()
+
+    if node.logic == "AND":
+
+        def score(cols):
+            scores = children[0](cols)
+            passed = scores > 0
+
+            for child in children[1:]:
+                child_scores = child(cols)
+                passed &= child_scores > 0
+                scores = np.minimum(scores, child_scores)
+
+            return np.where(passed, scores, 0.0)
+
+    else:
+
+        def score(cols):
+            scores = children[0](cols)
+
+            for child in children[1:]:
+                scores = np.maximum(scores, child(cols))
+
+            return scores
+
+    return score
+
+
+def _scalar_fallback(node):
+
+    def score(cols):
+        return np.fromiter(
+            (node.score(patient) for patient in cols.patients),
+            dtype=np.float64,
+            count=cols.size
+        )
+
+    return score
+
+
+def _vectorize_condition(node):
+
+    cond = node.source
+    field = cond["field"]
+    operator = cond["operator"]
+    weight = float(cond.get("weight", 1.0))
+    target = cond.get("value")
+
+    if operator == "exists":
+        return lambda cols: np.where(cols.present[field], weight, 0.0)
+
+    compare = _VECTOR_COMPARE.get(operator)
+
+    if compare is not None and _is_number(target):
+
+        def score(cols):
+            column = cols.numeric.get(field)
+
+            if column is None:
+                return _scalar_fallback(node)(cols)
+
+            hits = cols.present[field] & compare(column, target)
+            return np.where(hits, weight, 0.0)
+
+        return score
+
+    if operator == "in" and isinstance(target, (list, tuple, set, frozenset)) \
+            and all(_is_number(item) for item in target):
+
+        members = np.array(list(target), dtype=np.float64)
+
+        def score(cols):
+            column = cols.numeric.get(field)
+
+            if column is None:
+                return _scalar_fallback(node)(cols)
+
+            hits = cols.present[field] & np.isin(column, members)
+            return np.where(hits, weight, 0.0)
+
+        return score
+
+    # Strings, None targets and unknown operators keep scalar semantics
+    return _scalar_fallback(node)
+
+
+def _vectorize_age_based(node):
+
+    cond = node.source
+    field = cond["field"]
+    weight = float(cond.get("weight", 1.0))
+    bands = parse_age_bands(cond["age_based"])
+
+    if not all(_is_number(threshold) for _, _, threshold in bands):
+        return _scalar_fallback(node)
+
+    def score(cols):
+        values = cols.numeric.get(field)
+        ages = cols.numeric.get("age_months")
+
+        if values is None or ages is None:
+            return _scalar_fallback(node)(cols)
+
+        # First matching band wins, exactly like the scalar loop
+        thresholds = np.full(cols.size, np.nan)
+        assigned = np.zeros(cols.size, dtype=bool)
+
+        for min_age, max_age, threshold in bands:
+            in_band = ~assigned & (ages >= min_age) & (ages <= max_age)
+            thresholds[in_band] = threshold
+            assigned |= in_band
+
+        hits = (
+            cols.present[field]
+            & cols.present["age_months"]
+            & assigned
+            & (values >= thresholds)
+        )
+        return np.where(hits, weight, 0.0)
+
+    return score
+
+
+# ----------------------------------------
+# Batch Entry
+# ----------------------------------------
+
+def evaluate_many(compiled, patients, aggregate):
+    """
+    Evaluate every rule of `compiled` for every patient as vectorized
+    masks, returning one `aggregate()`-shaped result per patient.
+    """
+
+    patients = list(patients)
+
+    if not patients:
+        return []
+
+    cols = PatientColumns(patients, compiled.fields)
+
+    rules = compiled.rules
+    scores = np.empty((len(rules), len(patients)))
+
+    for i, rule in enumerate(rules):
+        scores[i] = vectorize_node(rule.criteria)(cols)
+
+    confidences = scores * np.array(
+        [rule.base_confidence for rule in rules], dtype=np.float64
+    )[:, None]
+
+    # Row-major nonzero keeps rules in their original order per patient
+    rows, rule_ids = np.nonzero(scores.T > 0)
+    hit_confidences = confidences.T[rows, rule_ids].tolist()
+
+    matches = [[] for _ in range(len(patients))]
+
+    for row, i, confidence in zip(rows.tolist(), rule_ids.tolist(), hit_confidences):
+        rule = rules[i]
+        matches[row].append({
+            "module": rule.module,
+            "condition": rule.classification,
+            "severity": rule.severity,
+            "priority": rule.priority,
+            "confidence": round(confidence, 2)
+        })
+
+    return [aggregate(matched) for matched in matches]
@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "engine"))
+
+from rulengine import IMCIRuleEngine
+from rule_compiler import compile_rules
+from result_cache import RuleResultCache
+from synthetic import PatientGenerator, generate_rules
+
+
+IMCI_RULES_PATH = os.path.join(BENCH_DIR, "..", "data", "imci_rules.json")
+
+MODES = ("scalar", "first_match", "cached", "batch")
+
+
+# ==============================
+# MEASUREMENT
+# ==============================
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_mode(mode, compiled, patients, batch_size):
+    """Return (total seconds, per-evaluation latencies in microseconds)."""
+
+    latencies = []
+
+    if mode == "batch":
+        engine = IMCIRuleEngine(compiled)
+        start = time.perf_counter()
+
+        for i in range(0, len(patients), batch_size):
+            chunk = patients[i:i + batch_size]
+            t0 = time.perf_counter_ns()
+            engine.evaluate_many(chunk)
+            per_patient = (time.perf_counter_ns() - t0) / 1000 / len(chunk)
+            latencies.extend([per_patient] * len(chunk))
+
+        return time.perf_counter() - start, latencies
+
+    cache = RuleResultCache() if mode == "cached" else None
+    first_match = mode == "first_match"
+
+    start = time.perf_counter()
+
+    for patient in patients:
+        t0 = time.perf_counter_ns()
+
+        if cache is not None:
+            cache.evaluate(compiled, patient)
+        else:
+            IMCIRuleEngine(compiled, patient).evaluate(first_match=first_match)
+
+        latencies.append((time.perf_counter_ns() - t0) / 1000)
+
+    return time.perf_counter() - start, latencies
+
+
+def benchmark(label, rules, args):
+    compiled = compile_rules(rules, reorder=args.reorder)
+    patients = PatientGenerator(rules, seed=args.seed).patients(args.patients)
+
+    rows = []
+
+    for mode in args.modes:
+        total, latencies = run_mode(mode, compiled, patients, args.batch_size)
+        latencies.sort()
+
+        rows.append({
+            "rule_set": label,
+            "rules": len(rules),
+            "mode": mode,
+            "patients": len(patients),
+            "patients_per_sec": round(len(patients) / total) if total else 0,
+            "p50_us": round(percentile(latencies, 0.50), 2),
+            "p99_us": round(percentile(latencies, 0.99), 2)
+        })
+
+    return rows
+
+
+# ==============================
+# REPORTING
+# ==============================
+
+COLUMNS = ("rule_set", "rules", "mode", "patients", "patients_per_sec", "p50_us", "p99_us")
+
+
+def print_table(rows):
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in COLUMNS}
+    print("  ".join(c.ljust(widths[c]) for c in COLUMNS))
+    print("  ".join("-" * widths[c] for c in COLUMNS))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(widths[c]) for c in COLUMNS))
+
+
+# ==============================
+# RUN
+# ==============================
+
+def main():
+    parser = argparse.ArgumentParser(description="IMCIRuleEngine throughput/latency benchmark")
+    parser.add_argument("--rule-counts", default="10,100,1000,5000",
+                        help="comma-separated synthetic rule-set sizes")
+    parser.add_argument("--depth", type=int, default=3, help="max criteria nesting depth")
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--reorder", action="store_true",
+                        help="compile with cost-ordered conditions")
+    parser.add_argument("--json", dest="json_out", help="also write results to this file")
+    args = parser.parse_args()
+
+    args.modes = [m for m in args.modes.split(",") if m]
+    unknown = set(args.modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+
+    rows = []
+
+    with open(IMCI_RULES_PATH) as f:
+        rows += benchmark("imci_rules.json", json.load(f)["rules"], args)
+
+    for count in (int(c) for c in args.rule_counts.split(",") if c):
+        rules = generate_rules(count, depth=args.depth, seed=args.seed)
+        rows += benchmark(f"synthetic/d{args.depth}", rules, args)
+
+    print_table(rows)
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import random
+from collections import defaultdict
+
+
+# ==============================
+# RULE INTROSPECTION
+# ==============================
+
+def collect_conditions(rules):
+    """Map every field referenced in the rules to the leaf conditions that read it."""
+
+    conditions = defaultdict(list)
+
+    def walk(node):
+        if not node:
+            return
+        if "logic" in node and "conditions" in node:
+            for child in node["conditions"]:
+                walk(child)
+        elif node.get("field"):
+            conditions[node["field"]].append(node)
+
+    for rule in rules:
+        walk(rule.get("criteria", {}))
+
+    return dict(conditions)
+
+
+def age_bands(rules):
+    bands = set()
+
+    for conds in collect_conditions(rules).values():
+        for cond in conds:
+            for age_range in cond.get("age_based", {}):
+                try:
+                    min_age, max_age = map(int, age_range.split("-"))
+                except ValueError:
+                    continue
+                bands.add((min_age, max_age))
+
+    return sorted(bands)
+
+
+def edge_ages(rules):
+    """Ages one either side of every age_based band boundary."""
+
+    ages = set()
+
+    for min_age, max_age in age_bands(rules):
+        ages.update((min_age - 1, min_age, max_age, max_age + 1))
+
+    return sorted(age for age in ages if age >= 0)
+
+
+# ==============================
+# SYNTHETIC PATIENTS
+# ==============================
+
+class PatientGenerator:
+    """
+    Seeded generator of patient dicts for a rule set.
+
+    Every field the rules read is populated (or left missing at
+    `missing_rate`), with values chosen around the thresholds the rules
+    compare against. A share of ages (`edge_age_rate`) is drawn from the
+    boundaries of the age_based bands.
+    """
+
+    def __init__(self, rules, seed=0, missing_rate=0.1, edge_age_rate=0.3):
+        self.rng = random.Random(seed)
+        self.conditions = collect_conditions(rules)
+        self.edge_ages = edge_ages(rules)
+        self.missing_rate = missing_rate
+        self.edge_age_rate = edge_age_rate
+
+        self.fields = sorted(set(self.conditions) | {"age_months"})
+
+    def patient(self):
+        patient = {}
+
+        for field in self.fields:
+            if self.rng.random() < self.missing_rate:
+                continue
+
+            if field == "age_months":
+                patient[field] = self._age()
+            else:
+                cond = self.rng.choice(self.conditions[field])
+                patient[field] = self._value(cond)
+
+        return patient
+
+    def patients(self, count):
+        return [self.patient() for _ in range(count)]
+
+    def _age(self):
+        if self.edge_ages and self.rng.random() < self.edge_age_rate:
+            return self.rng.choice(self.edge_ages)
+        return self.rng.randint(0, 59)
+
+    def _value(self, cond):
+        rng = self.rng
+
+        if "age_based" in cond:
+            thresholds = list(cond["age_based"].values()) or [0]
+            return rng.choice(thresholds) + rng.choice((-1, 0, 1))
+
+        operator = cond.get("operator")
+        target = cond.get("value")
+
+        if operator == "exists":
+            return True
+
+        if isinstance(target, bool):
+            return rng.random() < 0.5
+
+        if isinstance(target, (int, float)):
+            return rng.choice((target - 1, target, target + 1, rng.uniform(0, 2 * target + 1)))
+
+        if isinstance(target, (list, tuple)) and target:
+            if rng.random() < 0.5:
+                return rng.choice(list(target))
+            if all(isinstance(item, (int, float)) for item in target):
+                return max(target) + 1
+            return "__other__"
+
+        if isinstance(target, str):
+            return target if rng.random() < 0.5 else "__other__"
+
+        return rng.random() < 0.5
+
+
+# ==============================
+# SYNTHETIC RULE SETS
+# ==============================
+
+def generate_rules(count, depth=3, fanout=(2, 4), bool_fields=40, numeric_fields=10, seed=0):
+    """
+    Seeded IMCI-style rule set in the imci_rules.json format.
+
+    Criteria trees nest AND/OR groups up to `depth` levels with `fanout`
+    children per group, mixing boolean sign checks, numeric thresholds,
+    `in` lookups and age_based respiratory-rate thresholds.
+    """
+
+    rng = random.Random(seed)
+
+    signs = [f"sign_{i}" for i in range(bool_fields)]
+    measures = [f"measure_{i}" for i in range(numeric_fields)]
+    severities = (("High", 1), ("Medium", 2), ("Low", 3))
+
+    def leaf():
+        kind = rng.random()
+
+        if kind < 0.55:
+            return {"field": rng.choice(signs), "operator": "==", "value": True,
+                    "weight": rng.choice((1, 0.9, 0.8))}
+
+        if kind < 0.8:
+            return {"field": rng.choice(measures), "operator": rng.choice((">=", "<=", ">", "<")),
+                    "value": rng.randint(1, 100), "weight": rng.choice((1, 0.9, 0.8))}
+
+        if kind < 0.9:
+            return {"field": rng.choice(measures), "operator": "in",
+                    "value": rng.sample(range(1, 20), 3), "weight": 1}
+
+        return {"field": "respiratory_rate", "operator": ">=",
+                "age_based": {"0-1": 60, "2-11": 50, "12-59": 40}, "weight": 1}
+
+    def node(level):
+        if level >= depth or (level > 0 and rng.random() < 0.3):
+            return leaf()
+
+        return {
+            "logic": rng.choice(("AND", "OR")),
+            "conditions": [node(level + 1) for _ in range(rng.randint(*fanout))]
+        }
+
+    rules = []
+
+    for i in range(count):
+        severity, priority = rng.choice(severities)
+        rules.append({
+            "id": f"synthetic_{i}",
+            "module": rng.choice(("general", "cough", "diarrhoea", "fever", "ear", "nutrition")),
+            "classification": f"SYNTHETIC_{i}",
+            "severity": severity,
+            "priority": priority,
+            "base_confidence": rng.choice((1.0, 0.9, 0.8)),
+            "criteria": node(0)
+        })
+
+    return rules
@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+
+from fast_extractor import fast_extract
+
+
+# ==============================
+# LATENCY DISTRIBUTIONS
+# ==============================
+
+class Latency:
+    """
+    Seeded latency sampler, parsed from a spec string:
+
+        "0"                     no delay
+        "fixed:0.2"             always 0.2 s
+        "uniform:0.1,0.4"       uniform between 0.1 and 0.4 s
+        "lognormal:0.8,0.5"     median 0.8 s, sigma 0.5 (long right tail)
+
+    Draws come from one seeded generator, so a run with the same seed and
+    the same request order sees the same delays.
+    """
+
+    KINDS = ("fixed", "uniform", "lognormal")
+
+    def __init__(self, spec, seed=0):
+        self.spec = spec
+        kind, _, params = spec.partition(":")
+
+        if kind in ("", "0", "none"):
+            kind, values = "fixed", [0.0]
+        else:
+            values = [float(v) for v in params.split(",") if v]
+
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution {spec!r}, expected one of {self.KINDS}")
+
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2}[kind]
+        if len(values) != expected:
+            raise ValueError(f"{kind} latency takes {expected} parameter(s), got {spec!r}")
+
+        self.kind = kind
+        self.values = values
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        with self._lock:
+            if self.kind == "fixed":
+                return self.values[0]
+
+            if self.kind == "uniform":
+                return self._random.uniform(*self.values)
+
+            median, sigma = self.values
+            return self._random.lognormvariate(math.log(median), sigma)
+
+    def __repr__(self):
+        return f"Latency({self.spec!r})"
+
+
+# ==============================
+# CHAT MODEL
+# ==============================
+
+class FakeChunk:
+
+    __slots__ = ("content",)
+
+    def __init__(self, content):
+        self.content = content
+
+
+_PROMPT_TEXT = re.compile(r"Text:\n(.*?)\n\nReturn STRICT JSON", re.DOTALL)
+_RISK_LEVEL = re.compile(r"RISK LEVEL: (\w+)")
+_CONDITIONS = re.compile(r"^- (\w+) \(module", re.MULTILINE)
+
+# Small models rarely stop at the closing brace; the brain's early stop
+# should cut this off
+_TRAILING_CHATTER = (
+    "\n\nNote: this assessment is based on the information provided. "
+    "Please consult a qualified health worker for clinical decisions."
+)
+
+
+class FakeChatModel:
+    """
+    Deterministic stand-in for ChatOllama with the methods the brain uses
+    (`stream`, `astream`, `invoke`, `ainvoke`, `abatch`).
+
+    Responses are a pure function of the prompt: extraction prompts are
+    answered with the pattern extractor's fields, explanation prompts with
+    JSON that echoes the risk level and classifications. The generation
+    time drawn from `latency` is spread over `chunk_chars`-sized chunks,
+    so an early-stopped stream also finishes early.
+    """
+
+    def __init__(self, latency="fixed:0.5", seed=0, chunk_chars=12):
+        self.latency = latency if isinstance(latency, Latency) else Latency(latency, seed)
+        self.chunk_chars = chunk_chars
+        self.calls = 0
+
+    def respond(self, prompt):
+        text = _PROMPT_TEXT.search(prompt)
+
+        if text is not None:
+            fields, _ = fast_extract(text.group(1))
+            body = {k: v for k, v in fields.items() if v is not None}
+        else:
+            risk = _RISK_LEVEL.search(prompt)
+            conditions = _CONDITIONS.findall(prompt)
+
+            body = {
+                "risk_level": risk.group(1) if risk else "Unknown",
+                "explanation": (
+                    "The rule engine matched "
+                    + (", ".join(c.replace("_", " ").lower() for c in conditions) or "no classification")
+                    + " based on the reported signs, in line with the IMCI guidelines provided."
+                ),
+                "follow_up_questions": [
+                    "Is the child able to drink or breastfeed?",
+                    "Has the child had convulsions during this illness?",
+                    "How many days has the child been sick?"
+                ]
+            }
+
+        return "```json\n" + json.dumps(body, indent=2) + "\n```" + _TRAILING_CHATTER
+
+    def _chunks(self, prompt):
+        self.calls += 1
+
+        text = self.respond(prompt)
+        chunks = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+        delay = self.latency.sample() / len(chunks)
+
+        return chunks, delay
+
+    def stream(self, prompt, config=None):
+        chunks, delay = self._chunks(prompt)
+
+        for chunk in chunks:
+            time.sleep(delay)
+            yield FakeChunk(chunk)
+
+    async def astream(self, prompt, config=None):
+        chunks, delay = self._chunks(prompt)
+
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            yield FakeChunk(chunk)
+
+    def invoke(self, prompt, config=None):
+        return FakeChunk("".join(chunk.content for chunk in self.stream(prompt)))
+
+    async def ainvoke(self, prompt, config=None):
+        return FakeChunk("".join([chunk.content async for chunk in self.astream(prompt)]))
+
+    async def abatch(self, prompts, config=None, return_exceptions=False):
+        return await asyncio.gather(
+            *(self.ainvoke(prompt) for prompt in prompts),
+            return_exceptions=return_exceptions
+        )
+
+
+# ==============================
+# EMBEDDINGS
+# ==============================
+
+_WORD = re.compile(r"[a-z]+")
+
+
+class FakeEmbeddings:
+    """
+    Hashed bag-of-words vectors: deterministic, dependency-free, and close
+    enough to real embeddings that texts sharing words rank as similar.
+    `embed_query` blocks for a `latency` draw, like FastEmbed on CPU.
+    """
+
+    def __init__(self, latency="fixed:0.02", seed=0, dimensions=256):
+        self.latency = latency if isinstance(latency, Latency) else Latency(latency, seed)
+        self.dimensions = dimensions
+
+    def vector(self, text):
+        vector = [0.0] * self.dimensions
+
+        for word in _WORD.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_query(self, text):
+        time.sleep(self.latency.sample())
+        return self.vector(text)
+
+    def embed_documents(self, texts):
+        return [self.vector(text) for text in texts]
+
+
+# ==============================
+# VECTOR STORE
+# ==============================
+
+class FixtureDocument:
+
+    __slots__ = ("page_content", "metadata")
+
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+    def __repr__(self):
+        return f"FixtureDocument({self.page_content[:40]!r}...)"
+
+
+def matches_where(metadata, where):
+    """Chroma `where` semantics for the operators retrieval uses."""
+
+    if not where:
+        return True
+
+    if "$and" in where:
+        return all(matches_where(metadata, clause) for clause in where["$and"])
+    if "$or" in where:
+        return any(matches_where(metadata, clause) for clause in where["$or"])
+
+    for field, condition in where.items():
+        value = metadata.get(field)
+
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        for op, target in condition.items():
+            if op == "$eq" and value != target:
+                return False
+            if op == "$ne" and value == target:
+                return False
+            if op == "$in" and value not in target:
+                return False
+            if op == "$nin" and value in target:
+                return False
+
+    return True
+
+
+class FixtureVectorStore:
+    """
+    In-memory replacement for the Chroma handbook collection: brute-force
+    cosine search over a handful of fixture chunks, with Chroma-style
+    metadata filters and a `latency` draw per search.
+    """
+
+    def __init__(self, chunks, embeddings, latency="fixed:0.005", seed=0):
+        self.embeddings = embeddings
+        self.latency = latency if isinstance(latency, Latency) else Latency(latency, seed)
+
+        self.documents = [FixtureDocument(text, dict(metadata)) for text, metadata in chunks]
+        self.vectors = embeddings.embed_documents([doc.page_content for doc in self.documents])
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        time.sleep(self.latency.sample())
+
+        scored = [
+            (sum(a * b for a, b in zip(embedding, vector)), i)
+            for i, (doc, vector) in enumerate(zip(self.documents, self.vectors))
+            if matches_where(doc.metadata, filter)
+        ]
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+        return [self.documents[i] for _, i in scored[:k]]
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return self.similarity_search_by_vector(
+            self.embeddings.embed_query(query), k=k, filter=filter
+        )
@@ -0,0 +1,160 @@
+# ==============================
+# HANDBOOK FIXTURE CHUNKS
+# ==============================
+
+# A few handbook-style passages with the metadata builders/metadata_extractor.py
+# assigns, so every rung of the retrieval filter ladder has something to find.
+
+HANDBOOK_CHUNKS = [
+    (
+        "Check for general danger signs in every sick child aged 2 months up to 5 years. "
+        "Ask: is the child able to drink or breastfeed? Does the child vomit everything? "
+        "Has the child had convulsions? Look: is the child lethargic or unconscious?",
+        {"age_group": "2m-5y", "symptom_category": "danger_sign",
+         "section_type": "assessment", "severity_hint": "severe"}
+    ),
+    (
+        "A child with any general danger sign needs urgent attention. Complete the assessment "
+        "and any pre-referral treatment immediately so that referral is not delayed. "
+        "Classify as VERY SEVERE DISEASE and refer urgently to hospital.",
+        {"age_group": "general", "symptom_category": "danger_sign",
+         "section_type": "referral", "severity_hint": "severe"}
+    ),
+    (
+        "Does the child have cough or difficult breathing? For how long? Count the breaths in "
+        "one minute. Look for chest indrawing. Look and listen for stridor and wheeze.",
+        {"age_group": "2m-5y", "symptom_category": "cough",
+         "section_type": "assessment", "severity_hint": "unknown"}
+    ),
+    (
+        "Fast breathing is 50 breaths per minute or more in a child aged 2 months up to 12 months, "
+        "and 40 breaths per minute or more in a child aged 12 months up to 5 years.",
+        {"age_group": "2m-5y", "symptom_category": "cough",
+         "section_type": "classification", "severity_hint": "unknown"}
+    ),
+    (
+        "Any general danger sign or stridor in a calm child: classify as SEVERE PNEUMONIA OR VERY "
+        "SEVERE DISEASE. Give the first dose of an appropriate antibiotic and refer urgently.",
+        {"age_group": "2m-5y", "symptom_category": "cough",
+         "section_type": "classification", "severity_hint": "severe"}
+    ),
+    (
+        "Chest indrawing or fast breathing: classify as PNEUMONIA. Give oral amoxicillin for 5 days, "
+        "soothe the throat and relieve the cough with a safe remedy, and follow up in 3 days.",
+        {"age_group": "2m-5y", "symptom_category": "cough",
+         "section_type": "treatment", "severity_hint": "some"}
+    ),
+    (
+        "No signs of pneumonia or very severe disease: classify as COUGH OR COLD. If coughing for "
+        "more than 14 days, refer for assessment. Advise the mother when to return immediately.",
+        {"age_group": "2m-5y", "symptom_category": "cough",
+         "section_type": "classification", "severity_hint": "none"}
+    ),
+    (
+        "Does the child have fever by history, or feel hot, or a temperature of 37.5 C or above? "
+        "Decide the malaria risk. Look or feel for stiff neck and look for runny nose.",
+        {"age_group": "2m-5y", "symptom_category": "fever",
+         "section_type": "assessment", "severity_hint": "unknown"}
+    ),
+    (
+        "Fever with any general danger sign or stiff neck: classify as VERY SEVERE FEBRILE DISEASE. "
+        "Give the first dose of artesunate or quinine for severe malaria and refer urgently.",
+        {"age_group": "2m-5y", "symptom_category": "fever",
+         "section_type": "referral", "severity_hint": "severe"}
+    ),
+    (
+        "Malaria test positive: classify as MALARIA. Give the recommended first-line oral "
+        "antimalarial and paracetamol for high fever. Follow up in 3 days if fever persists.",
+        {"age_group": "2m-5y", "symptom_category": "fever",
+         "section_type": "treatment", "severity_hint": "some"}
+    ),
+    (
+        "For diarrhoea, look for sunken eyes and offer the child fluid to drink. Pinch the skin of the "
+        "abdomen. Two of lethargic, sunken eyes, not able to drink or skin pinch going back very "
+        "slowly: SEVERE DEHYDRATION.",
+        {"age_group": "2m-5y", "symptom_category": "diarrhea",
+         "section_type": "classification", "severity_hint": "severe"}
+    ),
+    (
+        "Some dehydration: give fluid, zinc supplements and food for some dehydration (Plan B). "
+        "Give oral rehydration solution in the clinic over 4 hours.",
+        {"age_group": "2m-5y", "symptom_category": "diarrhea",
+         "section_type": "treatment", "severity_hint": "some"}
+    ),
+    (
+        "Young infant aged 0 to 2 months: check for possible serious bacterial infection. Count the "
+        "breaths; 60 breaths per minute or more is fast breathing. Look for severe chest indrawing, "
+        "fever or low body temperature.",
+        {"age_group": "0-2_months", "symptom_category": "danger_sign",
+         "section_type": "assessment", "severity_hint": "severe"}
+    ),
+    (
+        "Young infant with possible serious bacterial infection: give the first dose of intramuscular "
+        "antibiotics, treat to prevent low blood sugar, keep the infant warm and refer urgently.",
+        {"age_group": "0-2_months", "symptom_category": "general",
+         "section_type": "referral", "severity_hint": "severe"}
+    ),
+    (
+        "Counsel the mother on feeding and on when to return. Return immediately if the child is not "
+        "able to drink or breastfeed, becomes sicker, or develops a fever.",
+        {"age_group": "general", "symptom_category": "general",
+         "section_type": "treatment", "severity_hint": "unknown"}
+    ),
+    (
+        "Check for malnutrition: look for visible severe wasting and oedema of both feet, measure "
+        "MUAC and determine weight for height. Assess feeding problems in every child under 2 years.",
+        {"age_group": "2m-5y", "symptom_category": "nutrition",
+         "section_type": "assessment", "severity_hint": "unknown"}
+    ),
+]
+
+
+# ==============================
+# REPLAYED REQUESTS
+# ==============================
+
+# One-shot /analyze texts, from terse clinician notes (fully resolved by the
+# pattern extractor) to caregiver wording that needs the LLM
+SYMPTOM_TEXTS = [
+    "14 month old with cough and fever, breathing 52 per minute, no chest indrawing, no convulsions",
+    "2 year old boy, fever for 3 days, cough, RR 38, no convulsions, no chest indrawing",
+    "6 week old infant, fever, fast breathing 64/min, chest indrawing",
+    "my daughter is 3 and has had a cough for a week, she is eating ok",
+    "baby 8 months hot to touch since yesterday and not feeding well",
+    "18 month child with fever and fast breathing and chest indrawing",
+    "child aged 4 years, had a fit this morning, very sleepy now",
+    "9 month old, cough, no fever, breathing rate 56, no chest indrawing, no convulsions",
+    "my son is two, coughing at night and his chest pulls in when he breathes",
+    "3 year old with fever, no cough, respiratory rate 30, no convulsions, no chest indrawing",
+    "newborn 3 weeks old, not breastfeeding, feels cold",
+    "20 months, running nose and mild cough, playing normally",
+    "5 month old convulsions during fever, breathing fast",
+    "toddler with high temperature and shaking, age 26 months",
+    "4 year old, cough 2 days, no fever, breathing 32 per minute, no chest indrawing, no convulsions",
+    "she is 11 months old, breathing very fast and grunting, has fever",
+]
+
+# Multi-turn /triage conversations: each message is one step
+SESSION_SCRIPTS = [
+    [
+        "my baby has a cough",
+        "she is 10 months old",
+        "she has fever too, no convulsions",
+        "breathing about 54 per minute, no chest indrawing",
+    ],
+    [
+        "2 year old with fever",
+        "no cough, no convulsions",
+        "respiratory rate 30, no chest indrawing",
+    ],
+    [
+        "child 3 years, had convulsions yesterday",
+        "fever and cough as well",
+    ],
+    [
+        "my son is coughing a lot",
+        "he is 18 months",
+        "breathing 44 per minute and the chest pulls in",
+        "no fever, no fits",
+    ],
+]
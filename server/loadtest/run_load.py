@@ -0,0 +1,366 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(LOADTEST_DIR, "..", "app", "engine"))
+sys.path.insert(0, os.path.join(LOADTEST_DIR, "..", "app", "core"))
+sys.path.insert(0, os.path.join(LOADTEST_DIR, "..", "api"))
+
+import httpx
+
+from fakes import FakeChatModel, FakeEmbeddings, FixtureVectorStore, Latency
+from fixtures import HANDBOOK_CHUNKS, SESSION_SCRIPTS, SYMPTOM_TEXTS
+
+
+SCENARIOS = ("analyze", "stream", "session")
+
+
+# ==============================
+# MEASUREMENT
+# ==============================
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Recorder:
+    """(label, status, seconds) per HTTP call; status None for exceptions."""
+
+    def __init__(self):
+        self.samples = []
+
+    def add(self, label, status, seconds):
+        self.samples.append((label, status, seconds))
+
+    async def call(self, label, request):
+        started = time.perf_counter()
+
+        try:
+            response = await request
+        except Exception:
+            self.add(label, None, time.perf_counter() - started)
+            return None
+
+        self.add(label, response.status_code, time.perf_counter() - started)
+        return response
+
+
+# ==============================
+# SCENARIOS
+# ==============================
+
+async def analyze(client, recorder, rng):
+    await recorder.call("/analyze", client.post("/analyze", json={"symptoms": rng.choice(SYMPTOM_TEXTS)}))
+
+
+async def stream(client, recorder, rng):
+    # The body is read to the end: latency is the full stream
+    await recorder.call(
+        "/analyze/stream",
+        client.post("/analyze/stream", json={"symptoms": rng.choice(SYMPTOM_TEXTS)})
+    )
+
+
+async def session(client, recorder, rng):
+    started = time.perf_counter()
+
+    response = await recorder.call("/triage", client.post("/triage"))
+    if response is None or response.status_code != 200:
+        recorder.add("session", response.status_code if response else None, time.perf_counter() - started)
+        return
+
+    session_id = response.json()["session_id"]
+    status = 200
+
+    for message in rng.choice(SESSION_SCRIPTS):
+        response = await recorder.call(
+            "/triage/{id}/step",
+            client.post(f"/triage/{session_id}/step", json={"message": message})
+        )
+
+        if response is None or response.status_code != 200:
+            status = response.status_code if response else None
+            break
+
+        if response.json().get("session_status") == "complete":
+            break
+
+    await recorder.call("DELETE /triage/{id}", client.delete(f"/triage/{session_id}"))
+    recorder.add("session", status, time.perf_counter() - started)
+
+
+RUNNERS = {"analyze": analyze, "stream": stream, "session": session}
+
+
+def parse_mix(mix):
+    """"analyze=3,session=1" → ([scenario], [weight])."""
+
+    weights = {}
+
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}, expected one of {SCENARIOS}")
+
+        weights[name] = float(weight or 1)
+
+    return list(weights), list(weights.values())
+
+
+async def drive(client, args):
+    """
+    Open-loop replay: scenarios start at the target rate whether or not
+    earlier ones have finished, so a slow server builds a backlog (and
+    sheds load) instead of silently lowering the offered rate.
+    """
+
+    rng = random.Random(args.seed)
+    names, weights = parse_mix(args.mix)
+    recorder = Recorder()
+    tasks = []
+
+    started = time.perf_counter()
+    next_at = started
+
+    while next_at - started < args.duration:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        scenario = rng.choices(names, weights)[0]
+        tasks.append(asyncio.ensure_future(
+            RUNNERS[scenario](client, recorder, random.Random(rng.random()))
+        ))
+
+        interval = 1 / args.rps
+        next_at += rng.expovariate(1 / interval) if args.arrivals == "poisson" else interval
+
+    offered = time.perf_counter() - started
+
+    done, pending = await asyncio.wait(tasks, timeout=args.drain) if tasks else (set(), set())
+    for task in pending:
+        task.cancel()
+
+    return recorder, len(tasks), offered, time.perf_counter() - started, len(pending)
+
+
+# ==============================
+# REPORTING
+# ==============================
+
+COLUMNS = ("endpoint", "requests", "ok", "rejected", "errors", "error_rate",
+           "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+
+
+def summarize(recorder, elapsed):
+    labels = sorted({label for label, _, _ in recorder.samples})
+    rows = []
+
+    for label in labels + ["all requests"]:
+        samples = [
+            s for s in recorder.samples
+            if (s[0] == label if label != "all requests" else s[0] != "session")
+        ]
+        latencies = sorted(1000 * seconds for _, _, seconds in samples)
+
+        ok = sum(1 for _, status, _ in samples if status is not None and status < 400)
+        rejected = sum(1 for _, status, _ in samples if status == 429)
+        errors = len(samples) - ok
+
+        rows.append({
+            "endpoint": label,
+            "requests": len(samples),
+            "ok": ok,
+            "rejected": rejected,
+            "errors": errors,
+            "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+            "throughput_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50), 1),
+            "p95_ms": round(percentile(latencies, 0.95), 1),
+            "p99_ms": round(percentile(latencies, 0.99), 1),
+            "max_ms": round(latencies[-1], 1) if latencies else 0.0
+        })
+
+    return rows
+
+
+def print_table(rows):
+    widths = {c: max(len(c), *(len(str(r[c])) for r in rows)) for c in COLUMNS}
+    print("  ".join(c.ljust(widths[c]) for c in COLUMNS))
+    print("  ".join("-" * widths[c] for c in COLUMNS))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(widths[c]) for c in COLUMNS))
+
+
+# ==============================
+# IN-PROCESS APP WITH FAKES
+# ==============================
+
+def install_fakes(api, args):
+    """Point the API module at fake model/embeddings and the fixture store."""
+
+    from rule_registry import RuleRegistry
+    from llm_cache import LLMCache
+
+    embeddings = FakeEmbeddings(Latency(args.embed_latency, args.seed + 1))
+
+    components = {
+        "llm": FakeChatModel(Latency(args.llm_latency, args.seed)),
+        "embeddings": embeddings,
+        "db": FixtureVectorStore(HANDBOOK_CHUNKS, embeddings, Latency(args.search_latency, args.seed + 2))
+    }
+
+    llm_cache = None
+
+    if args.llm_cache:
+        path = os.path.join(tempfile.mkdtemp(prefix="loadtest-"), "llm_cache.sqlite3")
+        llm_cache = LLMCache(path)
+
+    api.rule_registry = RuleRegistry(api.IMCI_RULES_PATH)
+    api.brain = api.build_brain(api.rule_registry, llm_cache, **components)
+    api.brain.warm_up()
+
+
+async def server_stats(client):
+    stats = {}
+
+    for path in ("/workers", "/sessions", "/llm_scheduler"):
+        try:
+            response = await client.get(path)
+            stats[path] = response.json()
+        except Exception as e:
+            stats[path] = {"error": str(e)}
+
+    return stats
+
+
+async def run(args):
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+        api = None
+    else:
+        # Read by the API module at import time
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        if args.workers:
+            os.environ["BRAIN_WORKERS"] = str(args.workers)
+        if args.queue is not None:
+            os.environ["BRAIN_QUEUE"] = str(args.queue)
+        if args.batch_window_ms is not None:
+            os.environ["LLM_BATCH_WINDOW_MS"] = str(args.batch_window_ms)
+
+        import main as api
+
+        install_fakes(api, args)
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=api.app),
+            base_url="http://loadtest",
+            timeout=args.timeout
+        )
+
+    try:
+        recorder, started, offered, elapsed, unfinished = await drive(client, args)
+        stats = await server_stats(client)
+    finally:
+        await client.aclose()
+
+        if api is not None:
+            await api.shutdown()
+
+    return recorder, started, offered, elapsed, unfinished, stats
+
+
+# ==============================
+# RUN
+# ==============================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Open-loop load test of the triage API with local model/embedding fakes"
+    )
+    parser.add_argument("--rps", type=float, default=10.0, help="target scenario starts per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of offered load")
+    parser.add_argument("--mix", default="analyze=3,session=1",
+                        help=f"weighted scenarios from {', '.join(SCENARIOS)}")
+    parser.add_argument("--arrivals", choices=("uniform", "poisson"), default="poisson")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout (s)")
+    parser.add_argument("--drain", type=float, default=60.0,
+                        help="seconds to wait for in-flight scenarios after the last start")
+
+    fakes = parser.add_argument_group("in-process fakes (ignored with --url)")
+    fakes.add_argument("--llm-latency", default="lognormal:0.4,0.5",
+                       help="per-call generation time: fixed:S, uniform:LO,HI or lognormal:MEDIAN,SIGMA")
+    fakes.add_argument("--embed-latency", default="uniform:0.005,0.02")
+    fakes.add_argument("--search-latency", default="uniform:0.001,0.005")
+    fakes.add_argument("--llm-cache", action="store_true", help="enable a fresh LLM response cache")
+    fakes.add_argument("--workers", type=int, help="BRAIN_WORKERS")
+    fakes.add_argument("--queue", type=int, help="BRAIN_QUEUE")
+    fakes.add_argument("--batch-window-ms", help="LLM_BATCH_WINDOW_MS ('' disables batching)")
+
+    parser.add_argument("--url", help="drive a running server instead of the in-process app")
+    parser.add_argument("--json", dest="json_out", help="also write the report to this file")
+    parser.add_argument("--max-error-rate", type=float,
+                        help="exit 1 if the overall error rate is above this")
+    parser.add_argument("--max-p99-ms", type=float, help="exit 1 if the overall p99 is above this")
+    args = parser.parse_args()
+
+    try:
+        parse_mix(args.mix)
+        for spec in (args.llm_latency, args.embed_latency, args.search_latency):
+            Latency(spec)
+    except ValueError as e:
+        parser.error(str(e))
+
+    recorder, started, offered, elapsed, unfinished, stats = asyncio.run(run(args))
+    rows = summarize(recorder, elapsed)
+
+    print(f"{started} scenarios started in {offered:.1f}s "
+          f"({started / offered if offered else 0:.1f}/s offered, target {args.rps}/s); "
+          f"finished after {elapsed:.1f}s, {unfinished} unfinished\n")
+    print_table(rows)
+
+    workers = stats.get("/workers", {})
+    if "queue_wait_ms" in workers:
+        print(f"\nserver queue wait p50/p99: {workers['queue_wait_ms']['p50']}/"
+              f"{workers['queue_wait_ms']['p99']} ms, "
+              f"service p50/p99: {workers['service_ms']['p50']}/{workers['service_ms']['p99']} ms, "
+              f"rejected: {workers['rejected']}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump({
+                "args": vars(args),
+                "scenarios_started": started,
+                "unfinished": unfinished,
+                "elapsed_s": round(elapsed, 2),
+                "endpoints": rows,
+                "server": stats
+            }, f, indent=2)
+
+    overall = rows[-1] if rows else None
+    failed = overall is None or unfinished > 0
+
+    if overall is not None and args.max_error_rate is not None and overall["error_rate"] > args.max_error_rate:
+        failed = True
+    if overall is not None and args.max_p99_ms is not None and overall["p99_ms"] > args.max_p99_ms:
+        failed = True
+
+    if failed and (args.max_error_rate is not None or args.max_p99_ms is not None):
+        print("\n❌ Load test thresholds not met")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
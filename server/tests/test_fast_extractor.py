@@ -0,0 +1,93 @@
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "app", "engine"))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "app", "core"))
+
+import pytest
+
+from brain import TriageBrain
+from fast_extractor import fast_extract
+
+
+# ==============================
+# NEGATION AFTER THE SIGN
+# ==============================
+
+@pytest.mark.parametrize("text", [
+    "12 months, cough, convulsions not present",
+    "12 months, cough, convulsions not seen",
+    "12 months, cough, convulsions: not",
+    "12 months, cough, convulsions absent",
+])
+def test_negation_after_sign(text):
+    fields, _ = fast_extract(text)
+    assert fields["convulsions"] is False
+
+
+def test_unparsed_negation_is_not_filler():
+    fields, complete = fast_extract("12 months, cough not improving")
+    assert fields["cough"] is True
+    assert not complete
+
+
+# ==============================
+# DASHES
+# ==============================
+
+@pytest.mark.parametrize("text", [
+    "cough - 2 months old",
+    "cough - 12 months old, fever",
+])
+def test_dash_before_number_is_not_an_answer(text):
+    fields, _ = fast_extract(text)
+    assert fields["cough"] is True
+
+
+def test_dash_before_duration_is_not_an_answer():
+    fields, complete = fast_extract("fever - 3 days")
+    assert fields["fever"] is True
+    assert not complete
+
+
+def test_dash_ending_clause_is_an_answer():
+    assert fast_extract("12 months, cough: -") == ({"age_months": 12, "cough": False}, True)
+
+
+# ==============================
+# CONVULSIONS
+# ==============================
+
+def test_fit_and_well_is_not_a_convulsion():
+    fields, complete = fast_extract("fit and well, 12 months, cough")
+    assert "convulsions" not in fields
+    assert not complete
+
+
+def test_llm_wins_where_it_disagrees():
+    merged = TriageBrain._merge_extraction(
+        None, {"convulsions": True, "age_months": 12}, {"convulsions": False}
+    )
+    assert merged == {"convulsions": False, "age_months": 12}
+
+
+# ==============================
+# RESPIRATORY RATE
+# ==============================
+
+def test_conflicting_rates_go_to_llm():
+    fields, complete = fast_extract("RR 50 RR 62, 12 months, cough")
+    assert "respiratory_rate" not in fields
+    assert not complete
+
+
+def test_fully_resolved_note():
+    fields, complete = fast_extract(
+        "2 year old boy, fever for 3 days, cough, RR 38, no convulsions, no chest indrawing"
+    )
+    assert complete
+    assert fields == {
+        "age_months": 24, "respiratory_rate": 38, "fever": True, "cough": True,
+        "convulsions": False, "chest_indrawing": False
+    }
@@ -0,0 +1,37 @@
+import asyncio
+import os
+import sys
+import time
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "app", "core"))
+
+import pytest
+
+from scheduler import ChatModelBackend, LLMScheduler
+
+
+def test_timed_out_generation_frees_its_slot():
+    async def complete(prompt):
+        await asyncio.sleep(0.5)
+        return prompt
+
+    async def run():
+        scheduler = LLMScheduler(
+            ChatModelBackend(None, complete=complete), max_in_flight=1, batch_window=0.01
+        )
+
+        with pytest.raises(asyncio.TimeoutError):
+            await scheduler.submit("slow", timeout=0.05)
+
+        started = time.monotonic()
+        result = await scheduler.submit("next", timeout=5)
+        elapsed = time.monotonic() - started
+
+        await scheduler.close()
+        return result, elapsed
+
+    result, elapsed = asyncio.run(run())
+
+    assert result == "next"
+    assert elapsed < 0.9
@@ -0,0 +1,34 @@
+import asyncio
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "app", "core"))
+
+import pytest
+
+from worker_pool import Overloaded, WorkerPool
+
+
+def test_zero_queue_admits_while_workers_are_free():
+    async def run():
+        pool = WorkerPool(workers=2, max_queue=0)
+        tickets = [await pool.acquire(), await pool.acquire()]
+
+        with pytest.raises(Overloaded):
+            await pool.acquire()
+
+        pool.release(tickets[0])
+        tickets[0] = await pool.acquire()
+
+        for ticket in tickets:
+            pool.release(ticket)
+
+        pool.shutdown()
+        return pool
+
+    pool = asyncio.run(run())
+
+    assert pool.admitted == 3
+    assert pool.rejected == 1
+    assert pool.running == 0